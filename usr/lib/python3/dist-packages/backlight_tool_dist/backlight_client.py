@@ -0,0 +1,164 @@
+#!/usr/bin/python3 -su
+
+## Copyright (C) 2026 - 2026 ENCRYPTED SUPPORT LLC <adrelanos@whonix.org>
+## See the file COPYING for copying conditions.
+
+"""
+backlight_client.py - Client for the backlight brightness service.
+"""
+
+import os
+import socket
+import sys
+
+from pathlib import Path
+from typing import Iterator, NoReturn
+
+## Test mode, see backlight-tool-dist-handler. Only honored when not running
+## as root.
+test_root: str = (
+    os.environ.get("BACKLIGHT_TOOL_DIST_TEST_ROOT", "")
+    if os.geteuid() != 0
+    else ""
+)
+
+service_socket_path: Path = Path(
+    f"{test_root}/run/backlight-tool-dist-service/service.sock"
+)
+
+
+class BacklightServiceError(Exception):
+    """
+    Raised when the backlight service can't be reached or rejects a
+    request.
+    """
+
+
+class BacklightClient:
+    """
+    A connection to the backlight service. Several requests can be sent over
+    the same connection.
+    """
+
+    def __init__(
+        self, socket_path: str = str(service_socket_path), timeout: float = 5.0
+    ) -> None:
+        """
+        Init function. Raises BacklightServiceError if the service can't be
+        reached.
+        """
+
+        self.service_socket: socket.socket = socket.socket(
+            socket.AF_UNIX, socket.SOCK_STREAM
+        )
+        self.service_socket.settimeout(timeout)
+        try:
+            self.service_socket.connect(socket_path)
+        except OSError as connect_error:
+            self.service_socket.close()
+            raise BacklightServiceError(
+                f"Could not connect to the backlight service at "
+                f"'{socket_path}': {connect_error}"
+            ) from connect_error
+        self.reply_file = self.service_socket.makefile(
+            "r", encoding="utf-8", newline="\n"
+        )
+
+    def close(self) -> None:
+        """
+        Closes the connection.
+        """
+
+        self.reply_file.close()
+        self.service_socket.close()
+
+    def request(self, request_str: str) -> str:
+        """
+        Sends a request and returns the reply value. Raises
+        BacklightServiceError if the request failed.
+        """
+
+        try:
+            self.service_socket.sendall(f"{request_str}\n".encode("utf-8"))
+        except OSError as request_error:
+            raise BacklightServiceError(
+                f"Backlight service request failed: {request_error}"
+            ) from request_error
+        return self.read_reply()
+
+    def watch(self) -> Iterator[str]:
+        """
+        Sends a watch request and yields the brightness of all devices, in
+        the same format as a list reply. First the current brightness, then
+        each change. Blocks until the next change. Raises
+        BacklightServiceError if the request failed or the service went
+        away.
+        """
+
+        self.service_socket.settimeout(None)
+        yield self.request("watch")
+        while True:
+            yield self.read_reply()
+
+    def read_reply(self) -> str:
+        """
+        Reads one reply line and returns its value. Raises
+        BacklightServiceError if the request failed.
+        """
+
+        try:
+            reply_str: str = self.reply_file.readline()
+        except OSError as request_error:
+            raise BacklightServiceError(
+                f"Backlight service request failed: {request_error}"
+            ) from request_error
+        if reply_str == "":
+            raise BacklightServiceError(
+                "The backlight service closed the connection!"
+            )
+        reply_str = reply_str.rstrip("\n")
+        if reply_str.startswith("OK "):
+            return reply_str[3:]
+        if reply_str.startswith("ERROR "):
+            raise BacklightServiceError(reply_str[6:])
+        raise BacklightServiceError(
+            f"Invalid reply '{reply_str}' from the backlight service!"
+        )
+
+
+def main() -> NoReturn:
+    """
+    Sends the request given on the command line to the backlight service and
+    prints the reply.
+    """
+
+    if len(sys.argv) < 2:
+        print(f"{sys.argv[0]}: ERROR: No request specified!", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        backlight_client: BacklightClient = BacklightClient()
+        try:
+            ## Print one line per update, until interrupted.
+            if sys.argv[1] == "watch":
+                for watch_str in backlight_client.watch():
+                    print(watch_str, flush=True)
+            reply_str: str = backlight_client.request(" ".join(sys.argv[1:]))
+            ## Print list replies like 'backlight-tool-dist-handler list'
+            ## does, one 'NAME PERCENTAGE' line per device.
+            if sys.argv[1] == "list":
+                reply_str = "\n".join(
+                    device_str.replace("=", " ", 1)
+                    for device_str in reply_str.split()
+                )
+            print(reply_str)
+        finally:
+            backlight_client.close()
+    except BacklightServiceError as service_error:
+        print(f"{sys.argv[0]}: ERROR: {service_error}", file=sys.stderr)
+        sys.exit(1)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
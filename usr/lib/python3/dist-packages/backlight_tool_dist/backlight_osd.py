@@ -0,0 +1,219 @@
+#!/usr/bin/python3 -su
+
+## Copyright (C) 2026 - 2026 ENCRYPTED SUPPORT LLC <adrelanos@whonix.org>
+## See the file COPYING for copying conditions.
+
+"""
+backlight_osd.py - On-screen brightness indicator. Stays resident for the
+session, follows the backlight service's change stream and briefly shows a
+bar whenever the brightness changes, i.e. when a brightness key is pressed.
+"""
+
+import sys
+import signal
+from typing import NoReturn
+from types import FrameType
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtNetwork import QLocalSocket
+from PyQt5.QtWidgets import (
+    QApplication,
+    QWidget,
+    QLabel,
+    QHBoxLayout,
+    QProgressBar,
+)
+
+from backlight_tool_dist.backlight_client import service_socket_path
+
+## How long the indicator stays visible after the last change.
+osd_visible_ms: int = 1500
+## How long to wait before connecting again if the service went away.
+reconnect_interval_ms: int = 2000
+
+
+class BacklightOsdWindow(QWidget):
+    """
+    The indicator window. Built once at startup and only shown and hidden
+    afterwards, so that a change is on screen with the next frame.
+    """
+
+    def __init__(self, parent: QWidget | None = None) -> None:
+        """
+        BacklightOsdWindow constructor.
+        """
+
+        super().__init__(parent)
+
+        ## Percentage of the preferred device last reported by the service,
+        ## None until the first update arrived.
+        self.last_pct: int | None = None
+
+        self.setWindowFlags(
+            Qt.Tool
+            | Qt.FramelessWindowHint
+            | Qt.WindowStaysOnTopHint
+            | Qt.WindowDoesNotAcceptFocus
+        )
+        self.setAttribute(Qt.WA_ShowWithoutActivating)
+        self.setWindowTitle("Brightness")
+        self.setFixedSize(300, 48)
+
+        self.brightness_label: QLabel = QLabel()
+        self.brightness_label.setText("Brightness")
+        self.brightness_bar: QProgressBar = QProgressBar()
+        self.brightness_bar.setRange(0, 100)
+        self.root_layout: QHBoxLayout = QHBoxLayout()
+        self.root_layout.addWidget(self.brightness_label)
+        self.root_layout.addWidget(self.brightness_bar)
+        self.setLayout(self.root_layout)
+
+        self.hide_timer: QTimer = QTimer(self)
+        self.hide_timer.setSingleShot(True)
+        self.hide_timer.setInterval(osd_visible_ms)
+        self.hide_timer.timeout.connect(self.hide)
+
+        self.reconnect_timer: QTimer = QTimer(self)
+        self.reconnect_timer.setSingleShot(True)
+        self.reconnect_timer.setInterval(reconnect_interval_ms)
+        self.reconnect_timer.timeout.connect(self.connect_service)
+
+        self.service_socket: QLocalSocket = QLocalSocket(self)
+        self.service_socket.connected.connect(self.start_watch)
+        self.service_socket.readyRead.connect(self.read_updates)
+        self.service_socket.disconnected.connect(self.service_lost)
+        self.service_socket.errorOccurred.connect(self.service_lost)
+
+        ## Do the layout and create the native window now, rather than on
+        ## the first change.
+        self.root_layout.activate()
+        self.winId()
+        self.place_window()
+
+    def place_window(self) -> None:
+        """
+        Moves the window to the bottom center of the primary screen. Wayland
+        compositors place windows themselves, see the window rule for
+        'backlight-tool-dist-osd' in the labwc configuration.
+        """
+
+        screen = QApplication.primaryScreen()
+        if screen is None:
+            return
+        screen_rect = screen.availableGeometry()
+        self.move(
+            screen_rect.x() + (screen_rect.width() - self.width()) // 2,
+            screen_rect.y() + screen_rect.height() - self.height() * 3,
+        )
+
+    def connect_service(self) -> None:
+        """
+        Connects to the backlight service. The service is socket activated,
+        so this starts it if needed.
+        """
+
+        if self.service_socket.state() != QLocalSocket.UnconnectedState:
+            return
+        self.service_socket.connectToServer(str(service_socket_path))
+
+    def start_watch(self) -> None:
+        """
+        Subscribes to brightness changes once connected.
+        """
+
+        self.service_socket.write(b"watch\n")
+
+    def service_lost(self) -> None:
+        """
+        Called when the connection failed or was closed, i.e. when the
+        service was restarted. Tries again later.
+        """
+
+        self.service_socket.abort()
+        self.last_pct = None
+        if not self.reconnect_timer.isActive():
+            self.reconnect_timer.start()
+
+    def read_updates(self) -> None:
+        """
+        Reads all complete update lines. Each has the brightness of all
+        devices in the format of a list reply, the preferred device first.
+        Only the latest update matters, earlier ones are skipped.
+        """
+
+        reply_str: str = ""
+        while self.service_socket.canReadLine():
+            reply_str = (
+                bytes(self.service_socket.readLine())
+                .decode("utf-8", errors="replace")
+                .rstrip("\n")
+            )
+            if reply_str.startswith("ERROR "):
+                print(
+                    f"ERROR: Backlight service refused to report changes: "
+                    f"{reply_str[6:]}",
+                    file=sys.stderr,
+                )
+                QApplication.exit(1)
+                return
+        if not reply_str.startswith("OK "):
+            return
+
+        device_str_list: list[str] = reply_str[3:].split()
+        if len(device_str_list) == 0:
+            return
+        bl_pct_str: str = device_str_list[0].rpartition("=")[2]
+        if not bl_pct_str.isdigit():
+            return
+        bl_pct: int = int(bl_pct_str)
+        ## The first update is the current brightness, not a change.
+        last_pct: int | None = self.last_pct
+        self.last_pct = bl_pct
+        if last_pct is None or last_pct == bl_pct:
+            return
+        self.show_level(bl_pct)
+
+    def show_level(self, bl_pct: int) -> None:
+        """
+        Shows the indicator with a brightness percentage, or updates it if
+        it is already shown, and (re-)starts the timer that hides it.
+        """
+
+        self.brightness_bar.setValue(bl_pct)
+        if not self.isVisible():
+            self.show()
+        self.hide_timer.start()
+
+
+# pylint: disable=unused-argument
+def signal_handler(sig: int, frame: FrameType | None) -> None:
+    """
+    Handles SIGINT and SIGTERM.
+    """
+
+    print("Received SIGINT or SIGTERM, exiting.", file=sys.stderr)
+    sys.exit(128 + sig)
+
+
+def main() -> NoReturn:
+    """
+    Main function.
+    """
+
+    app = QApplication(sys.argv)
+    app.setDesktopFileName("backlight-tool-dist-osd")
+    app.setQuitOnLastWindowClosed(False)
+
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    timer: QTimer = QTimer()
+    timer.start(500)
+    timer.timeout.connect(lambda: None)
+
+    window: BacklightOsdWindow = BacklightOsdWindow()
+    window.connect_service()
+    sys.exit(app.exec_())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1087 @@
+#!/usr/bin/python3 -su
+
+## Copyright (C) 2026 - 2026 ENCRYPTED SUPPORT LLC <adrelanos@whonix.org>
+## See the file COPYING for copying conditions.
+
+"""
+backlight_service.py - Long-lived backlight brightness service. Keeps the
+backlight drivers' sysfs files open and serves get, list, set, inc, dec and
+ramp requests over a UNIX socket, so that a brightness change does not need
+to spawn a privileged handler process. Clients can also watch for brightness
+changes.
+
+Clients are authorized using the same users and groups that privleap
+authorizes for the corresponding backlight-tool-dist-handler actions.
+"""
+
+import asyncio
+import bisect
+import concurrent.futures
+import configparser
+import errno
+import functools
+import grp
+import os
+import pwd
+import select
+import signal
+import socket
+import struct
+import sys
+
+from pathlib import Path
+from typing import Callable, NoReturn
+
+from backlight_tool_dist.backlight_client import (
+    service_socket_path,
+    test_root,
+)
+
+kernel_backlight_dir: Path = Path(f"{test_root}/sys/class/backlight")
+privleap_conf_dir: Path = Path(f"{test_root}/etc/privleap/conf.d")
+backlight_config_dir: Path = Path(f"{test_root}/etc/backlight-tool-dist.d")
+
+## LXQt's backlight helper prioritizes backlight drivers with `firmware` being
+## most preferable, `platform` below `firmware`, `raw` below `platform`, and
+## everything else below `raw`. Replicate that behavior here, the same way
+## backlight-tool-dist-handler does.
+driver_type_prio_dict: dict[str, int] = {
+    "firmware": 4,
+    "platform": 3,
+    "raw": 2,
+}
+
+## Maps service requests to the privleap actions that authorize them.
+request_action_dict: dict[str, str] = {
+    "get": "backlight-tool-dist-handler-get",
+    "list": "backlight-tool-dist-handler-list",
+    "set": "backlight-tool-dist-handler-set",
+    "inc": "backlight-tool-dist-handler-inc",
+    "dec": "backlight-tool-dist-handler-dec",
+    "ramp": "backlight-tool-dist-handler-ramp",
+    "watch": "backlight-tool-dist-handler-list",
+}
+
+## Upper bound on how often a ramp writes to the backlight driver, and the
+## longest ramp accepted. Same as backlight-tool-dist-handler.
+ramp_max_rate_hz: int = 60
+ramp_max_duration_ms: int = 10000
+
+## How often brightness is checked for watchers, until the kernel was seen
+## to notify about changes. Not all drivers go through the backlight core
+## when the brightness changes.
+watch_fallback_interval_seconds: float = 2.0
+## Watchers that do not read their updates are dropped once this much is
+## queued for them.
+watch_max_buffer_size: int = 65536
+
+## Easing curves for ramps, mapping progress (0 - 1) to eased progress.
+ramp_curve_dict: dict[str, Callable[[float], float]] = {
+    "linear": lambda progress: progress,
+    "ease-in": lambda progress: progress * progress,
+    "ease-out": lambda progress: 1 - (1 - progress) * (1 - progress),
+    "ease-in-out": lambda progress: progress * progress * (3 - 2 * progress),
+}
+
+
+## Brightness curves, see brightness_curve in
+## /etc/backlight-tool-dist.d/30_desktop-config-dist.conf.
+brightness_curve_tuple: tuple[str, ...] = ("linear", "perceptual")
+
+
+class BacklightError(Exception):
+    """
+    Raised when a backlight request cannot be fulfilled.
+    """
+
+
+@functools.cache
+def build_brightness_lut(
+    max_brightness: int, curve_name: str
+) -> tuple[int, ...]:
+    """
+    Builds the table that maps each percentage (index 0 - 100) to a raw
+    brightness value, the same way backlight-tool-dist-handler does. Raw
+    values never decrease as the percentage grows. If max_brightness is at
+    least 100, every percentage gets a raw value of its own, so converting a
+    percentage to a raw value and back is lossless.
+    """
+
+    lut_list: list[int] = [0]
+    for bl_pct in range(1, 101):
+        if curve_name == "perceptual":
+            ## Inverse of CIE 1931 lightness, treating the percentage as
+            ## perceived lightness. Rounded up, so that no percentage maps to
+            ## zero. 1560896 = 116^3, 9033 / 10 = 903.3.
+            if bl_pct > 8:
+                raw_val: int = -(
+                    -((bl_pct + 16) ** 3) * max_brightness // 1560896
+                )
+            else:
+                raw_val = -(-bl_pct * max_brightness * 10 // 9033)
+        else:
+            raw_val = -(-bl_pct * max_brightness // 100)
+
+        floor_val: int = lut_list[-1]
+        ceil_val: int = max_brightness
+        if max_brightness >= 100:
+            ## Leave room for one distinct raw value per remaining
+            ## percentage.
+            floor_val += 1
+            ceil_val = max_brightness - 100 + bl_pct
+        lut_list.append(min(ceil_val, max(floor_val, raw_val)))
+    return tuple(lut_list)
+
+
+def lut_raw_to_pct(lut: tuple[int, ...], raw_brightness: int) -> int:
+    """
+    Converts a raw brightness value to the largest percentage in a table
+    built by build_brightness_lut that does not exceed it, clamped to
+    1 - 100.
+    """
+
+    return max(1, bisect.bisect_right(lut, raw_brightness) - 1)
+
+
+class BacklightDevice:
+    """
+    A backlight driver under /sys/class/backlight. The brightness and
+    actual_brightness files are opened once and kept open.
+    """
+
+    def __init__(self, device_dir: Path, device_type: str) -> None:
+        """
+        Init function. Raises OSError or ValueError if the driver's files
+        can't be opened or read.
+        """
+
+        self.device_dir: Path = device_dir
+        self.device_type: str = device_type
+        self.max_brightness: int = int(
+            (device_dir / "max_brightness").read_text(encoding="utf-8")
+        )
+        if self.max_brightness < 1:
+            raise ValueError(
+                f"Invalid max_brightness '{self.max_brightness}' for "
+                f"backlight driver '{device_dir}'!"
+            )
+        self.lut: tuple[int, ...] = build_brightness_lut(
+            self.max_brightness, "linear"
+        )
+        self.actual_brightness_fd: int = os.open(
+            device_dir / "actual_brightness", os.O_RDONLY | os.O_CLOEXEC
+        )
+        try:
+            self.brightness_fd: int = os.open(
+                device_dir / "brightness", os.O_WRONLY | os.O_CLOEXEC
+            )
+        except OSError:
+            os.close(self.actual_brightness_fd)
+            raise
+
+    def close(self) -> None:
+        """
+        Closes the driver's files.
+        """
+
+        os.close(self.actual_brightness_fd)
+        os.close(self.brightness_fd)
+
+    def read_raw(self) -> int:
+        """
+        Reads the raw brightness value. sysfs attributes must be read from
+        offset 0 for the kernel to refresh the value, hence pread.
+        """
+
+        return int(os.pread(self.actual_brightness_fd, 64, 0))
+
+    def write_raw(self, raw_brightness: int) -> None:
+        """
+        Writes a raw brightness value.
+        """
+
+        os.pwrite(self.brightness_fd, f"{raw_brightness}\n".encode(), 0)
+        ## The fake driver used in test mode does not update
+        ## actual_brightness on its own.
+        if test_root != "":
+            (self.device_dir / "actual_brightness").write_text(
+                f"{raw_brightness}\n", encoding="utf-8"
+            )
+
+    def set_curve(self, curve_name: str) -> None:
+        """
+        Selects the brightness curve used to convert between percentages and
+        raw values.
+        """
+
+        self.lut = build_brightness_lut(self.max_brightness, curve_name)
+
+    def raw_to_pct(self, raw_brightness: int) -> int:
+        """
+        Converts a raw brightness value to the largest percentage that does
+        not exceed it, clamped to 1 - 100.
+        """
+
+        return lut_raw_to_pct(self.lut, raw_brightness)
+
+    def get_pct(self) -> int:
+        """
+        Returns the brightness as a percentage, clamped to 1 - 100.
+        """
+
+        return self.raw_to_pct(self.read_raw())
+
+    def get_applied_pct(self, bl_pct: int) -> int:
+        """
+        Returns the percentage get_pct reports after setting a percentage,
+        without reading it back. Some drivers update actual_brightness with
+        a delay.
+        """
+
+        return self.raw_to_pct(self.pct_to_raw(bl_pct))
+
+    def step_pct(self, steps: int) -> int:
+        """
+        Returns the percentage a number of inc or dec steps leads to. With a
+        small max_brightness, several percentages share a raw value, so the
+        percentage keeps going until the raw value actually changes.
+        """
+
+        bl_raw: int = self.read_raw()
+        bl_pct: int = step_pct(self.raw_to_pct(bl_raw), steps)
+        if steps > 0:
+            while bl_pct < 100 and self.lut[bl_pct] <= bl_raw:
+                bl_pct += 1
+        elif steps < 0:
+            while bl_pct > 1 and self.lut[bl_pct] >= bl_raw:
+                bl_pct -= 1
+        return bl_pct
+
+    def set_pct(self, bl_pct: int) -> None:
+        """
+        Sets the brightness from a percentage.
+        """
+
+        self.write_raw(self.pct_to_raw(bl_pct))
+
+    def pct_to_raw(self, bl_pct: int) -> int:
+        """
+        Converts a percentage to a raw brightness value. The table never
+        contains zero for a percentage of one or more, since that would turn
+        some panels off entirely.
+        """
+
+        return self.lut[bl_pct]
+
+
+def find_backlight_devices() -> list[BacklightDevice]:
+    """
+    Opens all backlight drivers. The preferred one comes first, it is the
+    one used unless link_devices is enabled or a device is requested by
+    name.
+    """
+
+    best_device_dir: Path | None = None
+    best_prio: int = 0
+    device_list: list[BacklightDevice] = []
+    try:
+        device_dir_list: list[Path] = sorted(kernel_backlight_dir.iterdir())
+    except OSError as dir_error:
+        raise BacklightError("No backlight driver found!") from dir_error
+
+    for device_dir in device_dir_list:
+        if not device_dir.is_dir():
+            continue
+        try:
+            device_type: str = (
+                (device_dir / "type").read_text(encoding="utf-8").strip()
+            )
+            device: BacklightDevice = BacklightDevice(device_dir, device_type)
+        except (OSError, ValueError) as device_error:
+            print(
+                f"WARNING: Could not open backlight driver '{device_dir}', "
+                f"skipping it: {device_error}",
+                file=sys.stderr,
+            )
+            continue
+        device_list.append(device)
+        device_prio: int = driver_type_prio_dict.get(device_type, 1)
+        if device_prio >= best_prio:
+            best_device_dir = device_dir
+            best_prio = device_prio
+
+    if best_device_dir is None:
+        raise BacklightError("No backlight driver found!")
+    device_list.sort(key=lambda device: device.device_dir != best_device_dir)
+    return device_list
+
+
+def load_backlight_config() -> dict[str, str]:
+    """
+    Reads /etc/backlight-tool-dist.d/*.conf, the same files
+    backlight-tool-dist-handler reads. Files are read in lexical order, later
+    settings override earlier ones.
+    """
+
+    config_dict: dict[str, str] = {}
+    try:
+        config_file_list: list[Path] = sorted(
+            backlight_config_dir.glob("*.conf")
+        )
+    except OSError:
+        return config_dict
+    for config_file in config_file_list:
+        try:
+            config_str: str = config_file.read_text(encoding="utf-8")
+        except OSError:
+            continue
+        for config_line in config_str.splitlines():
+            if config_line == "" or config_line.startswith("#"):
+                continue
+            config_key, _, config_value = config_line.partition("=")
+            config_dict[config_key] = config_value
+    return config_dict
+
+
+def step_pct(bl_pct: int, steps: int) -> int:
+    """
+    Applies a number of 5% steps to a brightness percentage, the same way
+    repeated inc or dec requests would.
+    """
+
+    for _ in range(steps):
+        bl_pct = min(100, 5 if bl_pct == 1 else bl_pct + 5)
+    for _ in range(-steps):
+        bl_pct = max(1, bl_pct - 5)
+    return bl_pct
+
+
+def parse_steps(steps_str: str) -> int:
+    """
+    Validates a signed step count argument.
+    """
+
+    try:
+        steps: int = int(steps_str)
+    except ValueError as steps_error:
+        raise BacklightError("Non-numeric step count specified!") from (
+            steps_error
+        )
+    if abs(steps) > 100:
+        raise BacklightError("Specified step count is out of range!")
+    return steps
+
+
+def parse_pct(bl_pct_str: str) -> int:
+    """
+    Validates a brightness percentage argument.
+    """
+
+    if not bl_pct_str.isdigit():
+        raise BacklightError("Non-numeric brightness percentage specified!")
+    bl_pct: int = int(bl_pct_str)
+    if bl_pct < 1 or bl_pct > 100:
+        raise BacklightError(
+            "Specified brightness percentage is out of range!"
+        )
+    return bl_pct
+
+
+def parse_duration_ms(duration_ms_str: str) -> int:
+    """
+    Validates a ramp duration argument, in milliseconds.
+    """
+
+    if not duration_ms_str.isdigit():
+        raise BacklightError("Non-numeric ramp duration specified!")
+    duration_ms: int = int(duration_ms_str)
+    if duration_ms > ramp_max_duration_ms:
+        raise BacklightError("Specified ramp duration is out of range!")
+    return duration_ms
+
+
+async def run_ramp(
+    device_list: list[BacklightDevice],
+    target_pct: int,
+    duration_ms: int,
+    curve_func: Callable[[float], float],
+) -> None:
+    """
+    Fades the brightness of the given devices to a target percentage,
+    writing at most ramp_max_rate_hz values per second. Frame times are
+    computed from the start of the ramp rather than from the previous frame,
+    so that slow writes do not stretch the ramp.
+    """
+
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    start_raw_list: list[int] = [device.read_raw() for device in device_list]
+    target_raw_list: list[int] = [
+        device.pct_to_raw(target_pct) for device in device_list
+    ]
+    last_raw_list: list[int] = list(start_raw_list)
+    frame_count: int = max(1, duration_ms * ramp_max_rate_hz // 1000)
+    frame_seconds: float = duration_ms / 1000 / frame_count
+    start_time: float = loop.time()
+    for frame_idx in range(1, frame_count + 1):
+        eased_progress: float = curve_func(frame_idx / frame_count)
+        for device_idx, device in enumerate(device_list):
+            bl_raw: int = max(
+                1,
+                round(
+                    start_raw_list[device_idx]
+                    + (
+                        target_raw_list[device_idx]
+                        - start_raw_list[device_idx]
+                    )
+                    * eased_progress
+                ),
+            )
+            if bl_raw != last_raw_list[device_idx]:
+                device.write_raw(bl_raw)
+                last_raw_list[device_idx] = bl_raw
+        if frame_idx != frame_count:
+            await asyncio.sleep(
+                max(0.0, start_time + frame_idx * frame_seconds - loop.time())
+            )
+
+
+class PrivleapAuthorizer:
+    """
+    Decides whether a peer may perform a request, based on the
+    AuthorizedUsers and AuthorizedGroups of the matching privleap action.
+    """
+
+    def __init__(self) -> None:
+        """
+        Init function.
+        """
+
+        self.action_user_dict: dict[str, set[str]] = {}
+        self.action_group_dict: dict[str, set[str]] = {}
+        self.load()
+
+    def load(self) -> None:
+        """
+        (Re-)reads the privleap configuration.
+        """
+
+        config_parser: configparser.ConfigParser = configparser.ConfigParser(
+            interpolation=None, strict=False
+        )
+        try:
+            config_parser.read(
+                sorted(privleap_conf_dir.glob("*.conf")), encoding="utf-8"
+            )
+        except (OSError, configparser.Error) as config_error:
+            print(
+                "ERROR: Could not read privleap configuration: "
+                f"{config_error}",
+                file=sys.stderr,
+            )
+        self.action_user_dict = {}
+        self.action_group_dict = {}
+        for action_name in request_action_dict.values():
+            section_name: str = f"action:{action_name}"
+            if section_name not in config_parser:
+                continue
+            section: configparser.SectionProxy = config_parser[section_name]
+            self.action_user_dict[action_name] = {
+                x.strip()
+                for x in section.get("AuthorizedUsers", "").split(",")
+                if x.strip() != ""
+            }
+            self.action_group_dict[action_name] = {
+                x.strip()
+                for x in section.get("AuthorizedGroups", "").split(",")
+                if x.strip() != ""
+            }
+
+    def is_authorized(self, peer_uid: int, request_name: str) -> bool:
+        """
+        Checks whether the user with the given UID may perform the request.
+        Root and the user the service runs as (i.e. in test mode) may do
+        anything.
+        """
+
+        if peer_uid in (0, os.geteuid()):
+            return True
+        action_name: str | None = request_action_dict.get(request_name)
+        if action_name is None:
+            return False
+        try:
+            peer_pwd: pwd.struct_passwd = pwd.getpwuid(peer_uid)
+        except KeyError:
+            return False
+        if peer_pwd.pw_name in self.action_user_dict.get(action_name, set()):
+            return True
+        authorized_group_set: set[str] = self.action_group_dict.get(
+            action_name, set()
+        )
+        for peer_gid in os.getgrouplist(peer_pwd.pw_name, peer_pwd.pw_gid):
+            try:
+                if grp.getgrgid(peer_gid).gr_name in authorized_group_set:
+                    return True
+            except KeyError:
+                continue
+        return False
+
+
+def get_peer_uid(peer_socket: socket.socket) -> int:
+    """
+    Returns the UID of the process on the other end of a UNIX socket.
+    """
+
+    peer_cred_bytes: bytes = peer_socket.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+    )
+    _, peer_uid, _ = struct.unpack("3i", peer_cred_bytes)
+    return peer_uid
+
+
+class BacklightService:
+    """
+    Serves backlight requests. Requests are handled one at a time on the
+    event loop, so requests are serialized. A request that sets several
+    devices writes to them in parallel.
+    """
+
+    def __init__(self) -> None:
+        """
+        Init function.
+        """
+
+        self.device_list: list[BacklightDevice] = []
+        self.authorizer: PrivleapAuthorizer = PrivleapAuthorizer()
+        self.ramp_task: asyncio.Task[None] | None = None
+        self.write_executor: concurrent.futures.ThreadPoolExecutor | None = (
+            None
+        )
+        self.link_devices: bool = False
+        self.brightness_curve: str = "linear"
+        ## Watch state. The drivers' actual_brightness files are registered
+        ## with change_epoll for POLLPRI, which the kernel raises when the
+        ## brightness changes. Only done while there are watchers.
+        self.watch_writer_list: list[asyncio.StreamWriter] = []
+        self.watch_str: str = ""
+        self.change_epoll: select.epoll | None = None
+        self.change_notify_seen: bool = False
+        self.change_notify_failed: bool = False
+        self.watch_fallback_handle: asyncio.TimerHandle | None = None
+        self.load_config()
+
+    def load_config(self) -> None:
+        """
+        Loads the settings shared with backlight-tool-dist-handler.
+        """
+
+        config_dict: dict[str, str] = load_backlight_config()
+        self.link_devices = config_dict.get("link_devices", "false") == "true"
+        self.brightness_curve = config_dict.get("brightness_curve", "linear")
+        if self.brightness_curve not in brightness_curve_tuple:
+            print(
+                "WARNING: Invalid value "
+                f"'{self.brightness_curve}' for 'brightness_curve', "
+                "ignoring it.",
+                file=sys.stderr,
+            )
+            self.brightness_curve = "linear"
+        for device in self.device_list:
+            device.set_curve(self.brightness_curve)
+
+    def reload(self) -> None:
+        """
+        Reloads authorization and settings, i.e. on SIGHUP.
+        """
+
+        self.authorizer.load()
+        self.load_config()
+
+    def get_device_list(self) -> list[BacklightDevice]:
+        """
+        Returns the open backlight drivers, opening them if needed. The
+        preferred driver comes first.
+        """
+
+        if len(self.device_list) == 0:
+            self.device_list = find_backlight_devices()
+            for device in self.device_list:
+                device.set_curve(self.brightness_curve)
+        return self.device_list
+
+    def get_linked_device_list(self) -> list[BacklightDevice]:
+        """
+        Returns the devices that plain percentage requests, inc, dec, step
+        and ramp apply to. That is only the preferred device, or all devices
+        if link_devices is enabled.
+        """
+
+        device_list: list[BacklightDevice] = self.get_device_list()
+        if self.link_devices:
+            return device_list
+        return device_list[:1]
+
+    def set_device_pcts(
+        self, device_pct_list: list[tuple[BacklightDevice, int]]
+    ) -> None:
+        """
+        Sets several devices at once. The writes are done in parallel, so
+        that a slow driver (i.e. DDC/CI over I2C) does not delay the others.
+        """
+
+        if len(device_pct_list) == 1:
+            device_pct_list[0][0].set_pct(device_pct_list[0][1])
+            return
+        if self.write_executor is None:
+            self.write_executor = concurrent.futures.ThreadPoolExecutor(
+                thread_name_prefix="backlight-write"
+            )
+        future_list: list[concurrent.futures.Future[None]] = [
+            self.write_executor.submit(device.set_pct, bl_pct)
+            for device, bl_pct in device_pct_list
+        ]
+        for future in future_list:
+            future.result()
+
+    def parse_set_args(
+        self, arg_list: list[str]
+    ) -> list[tuple[BacklightDevice, int]]:
+        """
+        Parses the arguments of a set request. These are either a single
+        percentage, applied to the linked devices, or one 'NAME=PERCENTAGE'
+        argument per device to set.
+        """
+
+        if len(arg_list) == 0:
+            raise BacklightError(
+                "No backlight brightness percentage specified!"
+            )
+        if len(arg_list) == 1 and "=" not in arg_list[0]:
+            bl_pct: int = parse_pct(arg_list[0])
+            return [
+                (device, bl_pct) for device in self.get_linked_device_list()
+            ]
+
+        device_dict: dict[str, BacklightDevice] = {
+            device.device_dir.name: device
+            for device in self.get_device_list()
+        }
+        device_pct_list: list[tuple[BacklightDevice, int]] = []
+        for device_arg_str in arg_list:
+            device_name, _, bl_pct_str = device_arg_str.partition("=")
+            device: BacklightDevice | None = device_dict.get(device_name)
+            if device is None:
+                raise BacklightError(
+                    f"Unknown backlight device '{device_name}'!"
+                )
+            device_pct_list.append((device, parse_pct(bl_pct_str)))
+        return device_pct_list
+
+    def cancel_ramp(self) -> None:
+        """
+        Stops a running ramp, so that it does not overwrite the value set by
+        a newer request.
+        """
+
+        if self.ramp_task is not None:
+            self.ramp_task.cancel()
+            self.ramp_task = None
+
+    def start_ramp(self, arg_list: list[str]) -> int:
+        """
+        Starts a ramp in the background and returns its target percentage.
+        The reply is sent right away, the client does not wait for the ramp
+        to finish.
+        """
+
+        if len(arg_list) not in (2, 3):
+            raise BacklightError(
+                "Ramp requires a target percentage and a duration!"
+            )
+        target_pct: int = parse_pct(arg_list[0])
+        duration_ms: int = parse_duration_ms(arg_list[1])
+        curve_name: str = arg_list[2] if len(arg_list) == 3 else "linear"
+        curve_func: Callable[[float], float] | None = ramp_curve_dict.get(
+            curve_name
+        )
+        if curve_func is None:
+            raise BacklightError(f"Invalid ramp curve '{curve_name}'!")
+
+        self.ramp_task = asyncio.get_running_loop().create_task(
+            run_ramp(
+                self.get_linked_device_list(),
+                target_pct,
+                duration_ms,
+                curve_func,
+            )
+        )
+        self.ramp_task.add_done_callback(self.ramp_done)
+        return target_pct
+
+    def ramp_done(self, ramp_task: asyncio.Task[None]) -> None:
+        """
+        Reports ramps that failed. If the driver disappeared, it is looked up
+        again on the next request.
+        """
+
+        if self.ramp_task is ramp_task:
+            self.ramp_task = None
+        if ramp_task.cancelled():
+            return
+        ramp_error: BaseException | None = ramp_task.exception()
+        if ramp_error is None:
+            return
+        print(
+            f"ERROR: Brightness ramp failed: {ramp_error}", file=sys.stderr
+        )
+        if isinstance(ramp_error, OSError):
+            self.drop_device()
+
+    def drop_device(self) -> None:
+        """
+        Closes the backlight drivers, i.e. after one of them disappeared.
+        """
+
+        self.cancel_ramp()
+        self.unwatch_devices()
+        for device in self.device_list:
+            try:
+                device.close()
+            except OSError:
+                pass
+        self.device_list = []
+
+    def watch_devices(self) -> None:
+        """
+        Registers the drivers for change notifications, if there are
+        watchers and this was not done yet.
+        """
+
+        if len(self.watch_writer_list) == 0 or self.change_epoll is not None:
+            return
+        device_list: list[BacklightDevice] = self.get_device_list()
+        self.change_epoll = select.epoll()
+        self.change_notify_failed = False
+        for device in device_list:
+            ## A file that was not read since it was opened counts as
+            ## changed.
+            device.read_raw()
+            try:
+                self.change_epoll.register(
+                    device.actual_brightness_fd, select.EPOLLPRI
+                )
+            except OSError:
+                ## Not a sysfs file, i.e. in a test setup.
+                self.change_notify_failed = True
+        asyncio.get_running_loop().add_reader(
+            self.change_epoll.fileno(), self.brightness_changed
+        )
+        if self.needs_watch_fallback():
+            self.schedule_watch_fallback()
+
+    def needs_watch_fallback(self) -> bool:
+        """
+        Checks whether the brightness must be checked periodically, since
+        change notifications were not seen working yet.
+        """
+
+        return not self.change_notify_seen or self.change_notify_failed
+
+    def unwatch_devices(self) -> None:
+        """
+        Stops change notifications, i.e. when the last watcher is gone.
+        """
+
+        if self.watch_fallback_handle is not None:
+            self.watch_fallback_handle.cancel()
+            self.watch_fallback_handle = None
+        if self.change_epoll is None:
+            return
+        asyncio.get_running_loop().remove_reader(self.change_epoll.fileno())
+        self.change_epoll.close()
+        self.change_epoll = None
+
+    def schedule_watch_fallback(self) -> None:
+        """
+        Checks the brightness again after watch_fallback_interval_seconds.
+        """
+
+        self.watch_fallback_handle = asyncio.get_running_loop().call_later(
+            watch_fallback_interval_seconds, self.watch_fallback
+        )
+
+    def watch_fallback(self) -> None:
+        """
+        Checks the brightness of drivers that did not notify about changes
+        so far.
+        """
+
+        self.watch_fallback_handle = None
+        self.broadcast_change()
+        if (
+            self.needs_watch_fallback()
+            and self.change_epoll is not None
+            and self.watch_fallback_handle is None
+        ):
+            self.schedule_watch_fallback()
+
+    def brightness_changed(self) -> None:
+        """
+        Called when the kernel notifies about a brightness change. Reading
+        the changed files in broadcast_change re-arms the notification.
+        """
+
+        if self.change_epoll is None:
+            return
+        self.change_epoll.poll(0)
+        self.change_notify_seen = True
+        if (
+            not self.needs_watch_fallback()
+            and self.watch_fallback_handle is not None
+        ):
+            self.watch_fallback_handle.cancel()
+            self.watch_fallback_handle = None
+        self.broadcast_change()
+
+    def broadcast_change(self) -> None:
+        """
+        Sends the brightness of all devices to the watchers, if it changed.
+        """
+
+        if len(self.watch_writer_list) == 0:
+            return
+        try:
+            ## Registers the drivers again if they were reopened.
+            self.watch_devices()
+            watch_str: str = self.perform("list", [])
+        except (BacklightError, OSError, ValueError) as device_error:
+            print(
+                f"WARNING: Could not read brightness for watchers: "
+                f"{device_error}",
+                file=sys.stderr,
+            )
+            self.drop_device()
+            return
+        if watch_str == self.watch_str:
+            return
+        self.watch_str = watch_str
+        for writer in list(self.watch_writer_list):
+            if writer.transport.get_write_buffer_size() > (
+                watch_max_buffer_size
+            ):
+                self.watch_writer_list.remove(writer)
+                writer.close()
+                continue
+            writer.write(f"OK {watch_str}\n".encode("utf-8"))
+
+    async def serve_watch(
+        self,
+        peer_uid: int,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        """
+        Streams brightness changes to a client. The client first gets the
+        current brightness in the same format as a list reply, then one
+        such reply whenever it changes, until it disconnects. Anything the
+        client sends after the watch request is ignored.
+        """
+
+        reply_str: str = self.handle_request(peer_uid, "watch")
+        if not reply_str.startswith("OK "):
+            writer.write(f"{reply_str}\n".encode("utf-8"))
+            await writer.drain()
+            return
+        ## Bring existing watchers up to date first, so that all of them
+        ## start from the same value.
+        self.broadcast_change()
+        self.watch_str = reply_str[3:]
+        writer.write(f"{reply_str}\n".encode("utf-8"))
+        await writer.drain()
+        self.watch_writer_list.append(writer)
+        try:
+            self.broadcast_change()
+            while await reader.readline() != b"":
+                pass
+        finally:
+            if writer in self.watch_writer_list:
+                self.watch_writer_list.remove(writer)
+            if len(self.watch_writer_list) == 0:
+                self.unwatch_devices()
+
+    def perform(self, request_name: str, arg_list: list[str]) -> str:
+        """
+        Performs a request and returns the reply value. That is the
+        resulting brightness percentage of the preferred device, or one
+        'NAME=PERCENTAGE' entry per device for list. If the preferred device
+        was set, its percentage is derived from the value written, the same
+        way backlight-tool-dist-handler does.
+        """
+
+        device: BacklightDevice = self.get_device_list()[0]
+        if request_name not in ("get", "list", "watch"):
+            self.cancel_ramp()
+        match request_name:
+            case "get":
+                pass
+            case "list" | "watch":
+                return " ".join(
+                    f"{list_device.device_dir.name}={list_device.get_pct()}"
+                    for list_device in self.get_device_list()
+                )
+            case "ramp":
+                return str(self.start_ramp(arg_list))
+            case "set":
+                device_pct_list: list[tuple[BacklightDevice, int]] = (
+                    self.parse_set_args(arg_list)
+                )
+                self.set_device_pcts(device_pct_list)
+                for set_device, set_pct in device_pct_list:
+                    if set_device is device:
+                        return str(device.get_applied_pct(set_pct))
+            case "inc" | "dec" | "step":
+                steps: int = {"inc": 1, "dec": -1}.get(request_name, 0)
+                if request_name == "step":
+                    if len(arg_list) != 1:
+                        raise BacklightError("No step count specified!")
+                    steps = parse_steps(arg_list[0])
+                bl_pct: int = device.step_pct(steps)
+                self.set_device_pcts(
+                    [
+                        (linked_device, bl_pct)
+                        for linked_device in self.get_linked_device_list()
+                    ]
+                )
+                return str(device.get_applied_pct(bl_pct))
+            case _:
+                raise BacklightError(
+                    f"Unrecognized request '{request_name}' specified!"
+                )
+        return str(device.get_pct())
+
+    def handle_request(self, peer_uid: int, request_str: str) -> str:
+        """
+        Authorizes and performs a single request line, returning the reply
+        line.
+        """
+
+        request_part_list: list[str] = request_str.split()
+        if len(request_part_list) == 0:
+            return "ERROR Empty request!"
+        request_name: str = request_part_list[0]
+        ## A step request is a coalesced series of inc or dec requests, and
+        ## is authorized as such.
+        auth_request_name: str = request_name
+        if request_name == "step":
+            step_arg_str: str = " ".join(request_part_list[1:2])
+            auth_request_name = (
+                "dec" if step_arg_str.startswith("-") else "inc"
+            )
+        if not self.authorizer.is_authorized(peer_uid, auth_request_name):
+            return f"ERROR Not authorized to perform '{request_name}'!"
+
+        ## If the driver disappeared (ENODEV) or was replaced, look it up
+        ## again and retry once.
+        for attempt_idx in range(2):
+            try:
+                return "OK " + str(
+                    self.perform(request_name, request_part_list[1:])
+                )
+            except BacklightError as backlight_error:
+                return f"ERROR {backlight_error}"
+            except (OSError, ValueError) as device_error:
+                self.drop_device()
+                if attempt_idx == 1 or (
+                    isinstance(device_error, OSError)
+                    and device_error.errno not in (errno.ENODEV, errno.ENOENT)
+                ):
+                    return f"ERROR {device_error}"
+        return "ERROR Unreachable!"
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Handles one client connection. A client may send any number of
+        newline-terminated requests, each of which gets one reply line. A
+        watch request turns the connection into a stream of updates, see
+        serve_watch.
+        """
+
+        peer_socket: socket.socket = writer.get_extra_info("socket")
+        try:
+            peer_uid: int = get_peer_uid(peer_socket)
+            while True:
+                request_bytes: bytes = await reader.readline()
+                if request_bytes == b"":
+                    break
+                request_str: str = request_bytes.decode(
+                    "utf-8", errors="replace"
+                )
+                if request_str.split()[:1] == ["watch"]:
+                    await self.serve_watch(peer_uid, reader, writer)
+                    break
+                reply_str: str = self.handle_request(peer_uid, request_str)
+                ## Not all drivers notify about changes, tell watchers about
+                ## this one right away.
+                self.broadcast_change()
+                writer.write(f"{reply_str}\n".encode("utf-8"))
+                await writer.drain()
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+def get_listen_socket() -> socket.socket:
+    """
+    Returns the socket passed in by systemd socket activation, or creates
+    one if the service was started directly.
+    """
+
+    if os.environ.get("LISTEN_PID", "") == str(os.getpid()) and int(
+        os.environ.get("LISTEN_FDS", "0")
+    ) >= 1:
+        return socket.socket(fileno=3)
+
+    service_socket_path.parent.mkdir(mode=0o755, exist_ok=True)
+    service_socket_path.unlink(missing_ok=True)
+    listen_socket: socket.socket = socket.socket(
+        socket.AF_UNIX, socket.SOCK_STREAM
+    )
+    listen_socket.bind(str(service_socket_path))
+    os.chmod(service_socket_path, 0o666)
+    listen_socket.listen()
+    return listen_socket
+
+
+async def serve() -> None:
+    """
+    Runs the service until SIGINT or SIGTERM is received.
+    """
+
+    backlight_service: BacklightService = BacklightService()
+    server: asyncio.Server = await asyncio.start_unix_server(
+        backlight_service.handle_client, sock=get_listen_socket()
+    )
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    stop_event: asyncio.Event = asyncio.Event()
+    loop.add_signal_handler(signal.SIGINT, stop_event.set)
+    loop.add_signal_handler(signal.SIGTERM, stop_event.set)
+    loop.add_signal_handler(signal.SIGHUP, backlight_service.reload)
+    print("INFO: Backlight service started.", file=sys.stderr)
+    await stop_event.wait()
+    server.close()
+    backlight_service.drop_device()
+
+
+def main() -> NoReturn:
+    """
+    Main function.
+    """
+
+    asyncio.run(serve())
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
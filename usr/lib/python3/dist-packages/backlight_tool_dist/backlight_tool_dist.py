@@ -9,16 +9,28 @@
 backlight_tool_dist.py - GUI utility for adjusting backlight brightness.
 """
 
+import os
 import sys
-import subprocess
+import html
 import signal
 import functools
-import traceback
-from typing import NoReturn
+from pathlib import Path
+from typing import NoReturn, Any
 from types import FrameType
 from PyQt5.QtCore import (
     Qt,
     QTimer,
+    QProcess,
+    QElapsedTimer,
+    QSocketNotifier,
+    Q_CLASSINFO,
+    pyqtSlot,
+)
+from PyQt5.QtGui import QCloseEvent
+from PyQt5.QtDBus import (
+    QDBusConnection,
+    QDBusAbstractAdaptor,
+    QDBusInterface,
 )
 from PyQt5.QtWidgets import (
     QApplication,
@@ -30,8 +42,32 @@ from PyQt5.QtWidgets import (
     QHBoxLayout,
     QSlider,
     QGroupBox,
+    QCheckBox,
+    QProgressBar,
+    QGridLayout,
+)
+
+from backlight_tool_dist.backlight_service import (
+    brightness_curve_tuple,
+    build_brightness_lut,
+    kernel_backlight_dir,
+    load_backlight_config,
+    lut_raw_to_pct,
 )
 
+agent_path: str = "/usr/bin/backlight-tool-dist-agent"
+## Live preview applies at most this often (about 30 frames per second).
+preview_min_interval_ms: int = 33
+## While the window is open, brightness changes made elsewhere (hotkeys,
+## ACPI, the power manager) are picked up from the kernel's change
+## notifications. Until a notification was seen, brightness is also checked
+## this often, since not all drivers notify.
+watch_fallback_interval_ms: int = 2000
+## Session bus name, object path and interface of the running instance. A
+## second launch asks it to show its window instead of starting another.
+dbus_service_name: str = "com.kicksecure.backlight_tool_dist"
+dbus_object_path: str = "/com/kicksecure/backlight_tool_dist"
+
 
 # pylint: disable=too-few-public-methods
 class ErrorWindow(QDialog):
@@ -63,29 +99,60 @@ class ErrorWindow(QDialog):
 
 
 # pylint: disable=too-many-instance-attributes, too-many-statements
+# pylint: disable=too-many-public-methods
 class BacklightToolWindow(QDialog):
     """
     Core backlight_tool_dist window.
     """
 
-    def __init__(self, bright_int: int, parent: QWidget | None = None) -> None:
+    def __init__(self, parent: QWidget | None = None) -> None:
         """
-        BacklightToolWindow constructor.
+        BacklightToolWindow constructor. The window is usable right away,
+        the brightness controls are enabled once start_brightness_fetch has
+        read the current brightness.
         """
 
         super().__init__(parent)
 
-        if bright_int < 1 or bright_int > 100:
-            self.error_window: ErrorWindow = ErrorWindow(
-                "The system reported an incorrect brightness percentage of"
-                f"'{bright_int}'!<br>"
-                "<br>"
-                "Please report this bug!"
-            )
-            self.error_window.exec_()
-            sys.exit(1)
-
-        self.bright_int = bright_int
+        ## Filled in by load_devices. The preferred device comes first.
+        self.device_name_list: list[str] = []
+        ## Brightness values are tuples with one percentage per device, in
+        ## the order of device_name_list.
+        self.bright_tuple: tuple[int, ...] = ()
+        self.syncing_sliders: bool = False
+        self.fetch_proc: QProcess | None = None
+
+        ## Live preview state. Slider changes are put into a single-slot
+        ## mailbox (preview_pending_value), newer values replace older ones.
+        ## At most one preview process runs at a time, when it finishes the
+        ## mailbox is drained again. Intermediate values are thus dropped.
+        self.preview_pending_value: tuple[int, ...] | None = None
+        self.preview_applied_value: tuple[int, ...] = self.bright_tuple
+        self.preview_proc: QProcess | None = None
+        self.preview_elapsed: QElapsedTimer = QElapsedTimer()
+        self.preview_timer: QTimer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.timeout.connect(self.drain_agent_requests)
+
+        ## Apply state. Works like the preview mailbox, but values are never
+        ## dropped for rate limiting, only replaced by a newer Apply. An
+        ## in-flight agent process is never killed, since that could leave
+        ## the privileged side half done. Pending Apply requests take
+        ## precedence over previews.
+        self.apply_pending_value: tuple[int, ...] | None = None
+        self.apply_proc: QProcess | None = None
+        self.apply_proc_value: tuple[int, ...] = self.bright_tuple
+        self.exit_requested: bool = False
+
+        ## Watch state, see start_watching. The lists have one entry per
+        ## device, None for devices that can't be watched.
+        self.watch_fd_list: list[int | None] = []
+        self.watch_lut_list: list[tuple[int, ...]] = []
+        self.watch_notifier_list: list[QSocketNotifier] = []
+        self.watch_notify_seen: bool = False
+        self.watch_fallback_timer: QTimer = QTimer(self)
+        self.watch_fallback_timer.setInterval(watch_fallback_interval_ms)
+        self.watch_fallback_timer.timeout.connect(self.check_all_devices)
 
         self.setWindowFlags(Qt.Window)
 
@@ -94,117 +161,725 @@ class BacklightToolWindow(QDialog):
 
         self.brightness_label: QLabel = QLabel()
         self.brightness_label.setText("Brightness")
+        self.status_label: QLabel = QLabel()
+        self.status_label.setWordWrap(True)
+        self.status_label.setTextInteractionFlags(
+            Qt.LinksAccessibleByMouse | Qt.TextSelectableByMouse
+        )
+        self.status_label.setText("Reading the current brightness...")
         self.slider_group_box: QGroupBox = QGroupBox()
-        self.inc_button: QPushButton = QPushButton()
-        self.inc_button.setText("+")
-        self.inc_button.setMaximumSize(30, 30)
-        self.dec_button: QPushButton = QPushButton()
-        self.dec_button.setText("-")
-        self.dec_button.setMaximumSize(30, 30)
-        self.brightness_slider: QSlider = QSlider()
-        self.brightness_slider.setMinimum(1)
-        self.brightness_slider.setMaximum(100)
-        self.brightness_slider.setSingleStep(1)
-        self.brightness_slider.setPageStep(5)
-        self.brightness_slider.setOrientation(Qt.Horizontal)
-        self.brightness_slider.setValue(self.bright_int)
+        ## One row of '-', slider and '+' per device. Device names are only
+        ## shown if there is more than one device. The first row is created
+        ## right away, so the window does not change size in the common case
+        ## of a single device.
+        self.slider_layout: QGridLayout = QGridLayout()
+        self.slider_list: list[QSlider] = []
+        self.add_slider_row()
+        self.slider_group_box.setLayout(self.slider_layout)
+        self.link_devices_checkbox: QCheckBox = QCheckBox()
+        self.link_devices_checkbox.setText("Link displays")
+        self.link_devices_checkbox.setChecked(True)
+        self.link_devices_checkbox.setVisible(False)
+        self.live_preview_checkbox: QCheckBox = QCheckBox()
+        self.live_preview_checkbox.setText("Live preview")
+        self.live_preview_checkbox.setChecked(True)
         self.reset_button: QPushButton = QPushButton()
         self.reset_button.setText("Reset")
         self.apply_button: QPushButton = QPushButton()
         self.apply_button.setText("Apply")
+        self.pending_bar: QProgressBar = QProgressBar()
+        ## A range of 0 - 0 shows a busy indicator.
+        self.pending_bar.setRange(0, 0)
+        self.pending_bar.setMaximumWidth(80)
+        self.pending_bar.setVisible(False)
         self.exit_button: QPushButton = QPushButton()
         self.exit_button.setText("Exit")
 
         self.button_layout: QHBoxLayout = QHBoxLayout()
         self.button_layout.addWidget(self.reset_button)
         self.button_layout.addStretch()
+        self.button_layout.addWidget(self.pending_bar)
         self.button_layout.addWidget(self.apply_button)
         self.button_layout.addWidget(self.exit_button)
-        self.slider_layout: QHBoxLayout = QHBoxLayout()
-        self.slider_layout.addWidget(self.dec_button)
-        self.slider_layout.addWidget(self.brightness_slider)
-        self.slider_layout.addWidget(self.inc_button)
-        self.slider_group_box.setLayout(self.slider_layout)
         self.main_layout: QVBoxLayout = QVBoxLayout()
         self.main_layout.addWidget(self.brightness_label)
         self.main_layout.addWidget(self.slider_group_box)
+        self.main_layout.addWidget(self.status_label)
+        self.main_layout.addWidget(self.link_devices_checkbox)
+        self.main_layout.addWidget(self.live_preview_checkbox)
         self.main_layout.addStretch()
         self.main_layout.addLayout(self.button_layout)
         self.setLayout(self.main_layout)
 
-        self.dec_button.clicked.connect(self.dec_brightness_slider)
-        self.inc_button.clicked.connect(self.inc_brightness_slider)
         self.reset_button.clicked.connect(self.reset_brightness_slider)
         self.apply_button.clicked.connect(self.apply_brightness)
-        self.exit_button.clicked.connect(functools.partial(sys.exit, 0))
+        self.exit_button.clicked.connect(self.exit_window)
+        self.live_preview_checkbox.toggled.connect(self.toggle_live_preview)
+
+        self.set_controls_enabled(False)
 
-    def dec_brightness_slider(self) -> None:
+    def add_slider_row(self) -> None:
         """
-        Moves the brightness slider down a tick.
+        Adds a row of brightness controls for the next device.
         """
 
-        self.brightness_slider.setValue(self.brightness_slider.value() - 1)
+        device_idx: int = len(self.slider_list)
+        dec_button: QPushButton = QPushButton()
+        dec_button.setText("-")
+        dec_button.setMaximumSize(30, 30)
+        inc_button: QPushButton = QPushButton()
+        inc_button.setText("+")
+        inc_button.setMaximumSize(30, 30)
+        brightness_slider: QSlider = QSlider()
+        brightness_slider.setMinimum(1)
+        brightness_slider.setMaximum(100)
+        brightness_slider.setSingleStep(1)
+        brightness_slider.setPageStep(5)
+        brightness_slider.setOrientation(Qt.Horizontal)
+        self.slider_layout.addWidget(dec_button, device_idx, 1)
+        self.slider_layout.addWidget(brightness_slider, device_idx, 2)
+        self.slider_layout.addWidget(inc_button, device_idx, 3)
+        self.slider_list.append(brightness_slider)
+
+        dec_button.clicked.connect(
+            functools.partial(self.step_brightness_slider, device_idx, -1)
+        )
+        inc_button.clicked.connect(
+            functools.partial(self.step_brightness_slider, device_idx, 1)
+        )
+        brightness_slider.valueChanged.connect(
+            functools.partial(self.brightness_slider_changed, device_idx)
+        )
 
-    def inc_brightness_slider(self) -> None:
+    def set_controls_enabled(self, enabled: bool) -> None:
         """
-        Moves the brightness slider up a tick.
+        Enables or disables everything that needs the current brightness.
         """
 
-        self.brightness_slider.setValue(self.brightness_slider.value() + 1)
+        self.slider_group_box.setEnabled(enabled)
+        self.link_devices_checkbox.setEnabled(enabled)
+        self.live_preview_checkbox.setEnabled(enabled)
+        self.reset_button.setEnabled(enabled)
+        self.apply_button.setEnabled(enabled)
 
-    def reset_brightness_slider(self) -> None:
+    def start_brightness_fetch(self) -> None:
         """
-        Resets the brightness slider to its last saved value.
+        Reads the current brightness of every device in the background.
         """
 
-        self.brightness_slider.setValue(self.bright_int)
+        self.fetch_proc = QProcess(self)
+        self.fetch_proc.finished.connect(self.brightness_fetch_finished)
+        self.fetch_proc.errorOccurred.connect(self.brightness_fetch_error)
+        self.fetch_proc.start(agent_path, ["list"])
+        self.pending_bar.setVisible(True)
 
-    def apply_brightness(self) -> None:
+    def brightness_fetch_finished(self) -> None:
         """
-        Saves the current brightness value and applies it to the hardware.
+        Called when the agent reporting the current brightness exits.
+        Errors are shown in the window rather than in a separate dialog.
         """
 
-        error_window: ErrorWindow
-        try:
-            set_bright_proc: subprocess.CompletedProcess[str] = subprocess.run(
-                [
-                    "/usr/bin/backlight-tool-dist-agent",
-                    "set",
-                    f"{self.brightness_slider.value()}",
-                ],
-                check=False,
-                capture_output=True,
-                encoding="utf-8",
+        if self.fetch_proc is None:
+            return
+        fetch_proc: QProcess = self.fetch_proc
+        self.fetch_proc = None
+        fetch_proc.deleteLater()
+        self.pending_bar.setVisible(False)
+        stdout_str: str = bytes(fetch_proc.readAllStandardOutput()).decode(
+            "utf-8", errors="replace"
+        )
+        if (
+            fetch_proc.exitStatus() != QProcess.NormalExit
+            or fetch_proc.exitCode() != 0
+        ):
+            stderr_str: str = bytes(fetch_proc.readAllStandardError()).decode(
+                "utf-8", errors="replace"
             )
-        except Exception:
-            error_window = ErrorWindow(
-                "The application was unable to get the current display for an "
-                "unknown reason!<br>"
+            self.status_label.setText(
+                "'/usr/bin/backlight-tool-dist-agent list' was unable to get "
+                "the system's current backlight value! Possible causes:<br>"
+                "- The system does not support display brightness "
+                "controls.<br>"
+                "- Your user account is not a member of the 'sudo' or "
+                "'privleap' groups.<br>"
                 "<br>"
-                "Please report this bug!<br>"
+                "Output from 'backlight-tool-dist-agent':<br>"
+                f"<pre>{html.escape(stdout_str)}"
+                f"{html.escape(stderr_str)}</pre>"
+            )
+            return
+
+        ## One 'NAME PERCENTAGE' line per device, the preferred device first.
+        device_pct_list: list[tuple[str, int]] = []
+        try:
+            for device_line in stdout_str.strip().splitlines():
+                device_name, device_pct_str = device_line.split()
+                device_pct: int = int(device_pct_str)
+                if device_pct < 1 or device_pct > 100:
+                    raise ValueError(
+                        f"Brightness of '{device_name}' is out of range."
+                    )
+                device_pct_list.append((device_name, device_pct))
+            if len(device_pct_list) == 0:
+                raise ValueError("No backlight devices reported.")
+        except ValueError:
+            self.status_label.setText(
+                "The system reported an invalid brightness value of "
+                f"'{html.escape(stdout_str.strip())}'!<br>"
                 "<br>"
-                "Error details:<br>"
-                f"<pre>{traceback.format_exc()}</pre>"
+                "Please report this bug!"
             )
-            error_window.exec_()
-            sys.exit(1)
+            return
+
+        self.load_devices(device_pct_list)
+
+    def brightness_fetch_error(
+        self, proc_error: QProcess.ProcessError
+    ) -> None:
+        """
+        Called if the agent reporting the current brightness fails. If it
+        could not be started, finished is never emitted, so report the error
+        here.
+        """
+
+        if proc_error != QProcess.FailedToStart or self.fetch_proc is None:
+            return
+        self.status_label.setText(
+            "The application was unable to start "
+            "'/usr/bin/backlight-tool-dist-agent'!<br>"
+            "<br>"
+            "Error details:<br>"
+            f"<pre>{html.escape(self.fetch_proc.errorString())}</pre>"
+        )
+        self.fetch_proc.deleteLater()
+        self.fetch_proc = None
+        self.pending_bar.setVisible(False)
+
+    def load_devices(self, device_pct_list: list[tuple[str, int]]) -> None:
+        """
+        Fills in the current brightness of each device and enables the
+        controls.
+        """
+
+        self.device_name_list = [
+            device_name for device_name, _ in device_pct_list
+        ]
+        self.bright_tuple = tuple(
+            device_pct for _, device_pct in device_pct_list
+        )
+        self.preview_applied_value = self.bright_tuple
+        self.apply_proc_value = self.bright_tuple
+
+        while len(self.slider_list) < len(self.device_name_list):
+            self.add_slider_row()
+        if len(self.device_name_list) > 1:
+            for device_idx, device_name in enumerate(self.device_name_list):
+                device_label: QLabel = QLabel()
+                device_label.setText(device_name)
+                self.slider_layout.addWidget(device_label, device_idx, 0)
+            self.link_devices_checkbox.setVisible(True)
+
+        self.syncing_sliders = True
+        for brightness_slider, bright_int in zip(
+            self.slider_list, self.bright_tuple
+        ):
+            brightness_slider.setValue(bright_int)
+        self.syncing_sliders = False
+
+        self.status_label.setVisible(False)
+        self.set_controls_enabled(True)
+        self.start_watching()
+
+    def start_watching(self) -> None:
+        """
+        Opens each device's actual_brightness file in sysfs, which is world
+        readable, and waits for the kernel to signal a change on it
+        (POLLPRI). Raw values are converted the same way the handler does.
+        """
+
+        curve_name: str = load_backlight_config().get(
+            "brightness_curve", "linear"
+        )
+        if curve_name not in brightness_curve_tuple:
+            curve_name = "linear"
+        for device_idx, device_name in enumerate(self.device_name_list):
+            device_dir: Path = kernel_backlight_dir / device_name
+            try:
+                max_brightness: int = int(
+                    (device_dir / "max_brightness").read_text(encoding="utf-8")
+                )
+                watch_fd: int = os.open(
+                    device_dir / "actual_brightness",
+                    os.O_RDONLY | os.O_CLOEXEC,
+                )
+            except (OSError, ValueError):
+                self.watch_fd_list.append(None)
+                self.watch_lut_list.append(())
+                continue
+            if max_brightness < 1:
+                os.close(watch_fd)
+                self.watch_fd_list.append(None)
+                self.watch_lut_list.append(())
+                continue
+            ## A file that was not read since it was opened counts as
+            ## changed.
+            os.pread(watch_fd, 64, 0)
+            self.watch_fd_list.append(watch_fd)
+            self.watch_lut_list.append(
+                build_brightness_lut(max_brightness, curve_name)
+            )
+            watch_notifier: QSocketNotifier = QSocketNotifier(
+                watch_fd, QSocketNotifier.Exception, self
+            )
+            watch_notifier.activated.connect(
+                functools.partial(self.device_change_notified, device_idx)
+            )
+            self.watch_notifier_list.append(watch_notifier)
+        if any(watch_fd is not None for watch_fd in self.watch_fd_list):
+            self.watch_fallback_timer.start()
+
+    def stop_watching(self) -> None:
+        """
+        Stops watching for brightness changes and closes the files.
+        """
+
+        self.watch_fallback_timer.stop()
+        for watch_notifier in self.watch_notifier_list:
+            watch_notifier.setEnabled(False)
+        self.watch_notifier_list = []
+        for watch_fd in self.watch_fd_list:
+            if watch_fd is not None:
+                os.close(watch_fd)
+        self.watch_fd_list = []
+
+    def device_change_notified(self, device_idx: int, _fd: int) -> None:
+        """
+        Called when the kernel signals a brightness change. Notifications
+        work, so the fallback timer is not needed anymore. The notifier's
+        'socket' argument is ignored.
+        """
+
+        if not self.watch_notify_seen:
+            self.watch_notify_seen = True
+            self.watch_fallback_timer.stop()
+        self.check_device(device_idx)
+
+    def check_all_devices(self) -> None:
+        """
+        Checks the brightness of all devices, see watch_fallback_interval_ms.
+        """
+
+        for device_idx in range(len(self.watch_fd_list)):
+            self.check_device(device_idx)
+
+    def check_device(self, device_idx: int) -> None:
+        """
+        Reads a device's brightness, which also re-arms the change
+        notification, and takes over changes that were made elsewhere.
+        Changes are ignored while an agent request of this window is in
+        flight, since they are most likely caused by it.
+        """
+
+        watch_fd: int | None = self.watch_fd_list[device_idx]
+        if watch_fd is None:
+            return
+        try:
+            bl_pct: int = lut_raw_to_pct(
+                self.watch_lut_list[device_idx],
+                int(os.pread(watch_fd, 64, 0)),
+            )
+        except (OSError, ValueError):
+            return
+        if self.apply_proc is not None or self.preview_proc is not None:
+            return
+        if bl_pct == self.preview_applied_value[device_idx]:
+            return
+
+        ## The brightness was changed elsewhere. That value was saved, so it
+        ## is the new baseline for Reset and for leaving the window.
+        self.bright_tuple = self.replace_device_value(
+            self.bright_tuple, device_idx, bl_pct
+        )
+        self.preview_applied_value = self.replace_device_value(
+            self.preview_applied_value, device_idx, bl_pct
+        )
+        brightness_slider: QSlider = self.slider_list[device_idx]
+        if (
+            brightness_slider.isSliderDown()
+            or self.preview_pending_value is not None
+            or self.apply_pending_value is not None
+        ):
+            return
+        self.syncing_sliders = True
+        brightness_slider.setValue(bl_pct)
+        self.syncing_sliders = False
+
+    @staticmethod
+    def replace_device_value(
+        value: tuple[int, ...], device_idx: int, bl_pct: int
+    ) -> tuple[int, ...]:
+        """
+        Returns a brightness value with one device's percentage replaced.
+        """
+
+        return value[:device_idx] + (bl_pct,) + value[device_idx + 1 :]
+
+    def step_brightness_slider(
+        self, device_idx: int, step: int, _checked: bool = False
+    ) -> None:
+        """
+        Moves a brightness slider up or down a tick. The clicked signal's
+        'checked' argument is ignored.
+        """
+
+        brightness_slider: QSlider = self.slider_list[device_idx]
+        brightness_slider.setValue(brightness_slider.value() + step)
+
+    def reset_brightness_slider(self) -> None:
+        """
+        Resets the brightness sliders to their last saved values.
+        """
+
+        self.syncing_sliders = True
+        for brightness_slider, bright_int in zip(
+            self.slider_list, self.bright_tuple
+        ):
+            brightness_slider.setValue(bright_int)
+        self.syncing_sliders = False
+        self.queue_preview()
+
+    def brightness_slider_changed(self, device_idx: int, value: int) -> None:
+        """
+        Called when a brightness slider moves. With linked displays, the
+        other sliders follow it.
+        """
+
+        if self.syncing_sliders:
+            return
+        if self.link_devices_checkbox.isChecked():
+            self.syncing_sliders = True
+            for other_idx, brightness_slider in enumerate(self.slider_list):
+                if other_idx != device_idx:
+                    brightness_slider.setValue(value)
+            self.syncing_sliders = False
+        self.queue_preview()
+
+    def get_slider_value(self) -> tuple[int, ...]:
+        """
+        Returns the values of all brightness sliders.
+        """
+
+        return tuple(
+            brightness_slider.value() for brightness_slider in self.slider_list
+        )
+
+    def get_agent_value_args(self, value: tuple[int, ...]) -> list[str]:
+        """
+        Returns the backlight-tool-dist-agent arguments that set a
+        brightness value. With a single device, the plain percentage is
+        passed, so the handler's link_devices setting applies.
+        """
+
+        if len(value) == 1:
+            return [f"{value[0]}"]
+        return [
+            f"{device_name}={bright_int}"
+            for device_name, bright_int in zip(self.device_name_list, value)
+        ]
+
+    def queue_preview(self) -> None:
+        """
+        Puts the slider values into the preview mailbox, replacing any value
+        that has not been applied yet.
+        """
+
+        if not self.live_preview_checkbox.isChecked():
+            return
+        self.preview_pending_value = self.get_slider_value()
+        self.drain_agent_requests()
+
+    def drain_agent_requests(self) -> None:
+        """
+        Starts the next agent request, if any and if none is in flight. Called
+        whenever a request is queued and whenever an agent process exits.
+        """
+
+        self.drain_apply_mailbox()
+        self.drain_preview_mailbox()
+        self.pending_bar.setVisible(
+            self.apply_proc is not None
+            or self.apply_pending_value is not None
+            or self.exit_requested
+        )
+        if (
+            self.exit_requested
+            and self.apply_proc is None
+            and self.preview_proc is None
+            and self.apply_pending_value is None
+            and self.preview_pending_value is None
+        ):
+            sys.exit(0)
+
+    def drain_preview_mailbox(self) -> None:
+        """
+        Applies the value in the preview mailbox, unless an agent request is
+        still in flight or the last preview was started too recently. In both
+        cases this is called again later.
+        """
+
+        if self.preview_pending_value is None:
+            return
+        if self.preview_proc is not None or self.apply_proc is not None:
+            return
+        if self.preview_elapsed.isValid():
+            remaining_ms: int = (
+                preview_min_interval_ms - self.preview_elapsed.elapsed()
+            )
+            if remaining_ms > 0:
+                if not self.preview_timer.isActive():
+                    self.preview_timer.start(remaining_ms)
+                return
+
+        preview_value: tuple[int, ...] = self.preview_pending_value
+        self.preview_pending_value = None
+        if preview_value == self.preview_applied_value:
+            return
+
+        self.preview_elapsed.start()
+        self.preview_applied_value = preview_value
+        self.preview_proc = QProcess(self)
+        self.preview_proc.finished.connect(self.preview_finished)
+        self.preview_proc.errorOccurred.connect(self.preview_error)
+        self.preview_proc.start(
+            agent_path, ["preview", *self.get_agent_value_args(preview_value)]
+        )
+
+    def preview_finished(self) -> None:
+        """
+        Called when a preview process exits. Failures are only reported on
+        stderr, Apply reports errors to the user.
+        """
+
+        if self.preview_proc is None:
+            return
+        if (
+            self.preview_proc.exitStatus() != QProcess.NormalExit
+            or self.preview_proc.exitCode() != 0
+        ):
+            print(
+                "Live preview failed: "
+                + bytes(self.preview_proc.readAllStandardError())
+                .decode("utf-8", errors="replace")
+                .strip(),
+                file=sys.stderr,
+            )
+        self.preview_proc.deleteLater()
+        self.preview_proc = None
+        self.drain_agent_requests()
+
+    def preview_error(self, proc_error: QProcess.ProcessError) -> None:
+        """
+        Called if a preview process fails. If it could not be started,
+        finished is never emitted, so clean up here.
+        """
+
+        if proc_error != QProcess.FailedToStart or self.preview_proc is None:
+            return
+        print(
+            f"Live preview failed: {self.preview_proc.errorString()}",
+            file=sys.stderr,
+        )
+        self.preview_proc.deleteLater()
+        self.preview_proc = None
+        self.drain_agent_requests()
+
+    def toggle_live_preview(self, checked: bool) -> None:
+        """
+        Previews the current slider value when live preview is turned on,
+        and restores the committed value when it is turned off.
+        """
+
+        if checked:
+            self.queue_preview()
+        else:
+            self.restore_committed_brightness()
+
+    def restore_committed_brightness(self) -> None:
+        """
+        Undoes any previewed brightness by re-applying the last committed
+        value. Goes through the preview mailbox, so a preview that is
+        still queued is dropped and one in flight finishes first.
+        """
+
+        self.preview_pending_value = self.bright_tuple
+        self.drain_agent_requests()
+
+    def exit_window(self) -> None:
+        """
+        Restores the committed brightness and exits. The window is hidden
+        right away, the process exits once pending agent requests are done.
+        """
+
+        self.exit_requested = True
+        self.stop_watching()
+        self.hide()
+        ## Pending agent requests can keep this process around for a bit,
+        ## let the next launch start a new instance rather than ask this one
+        ## to show its window.
+        QDBusConnection.sessionBus().unregisterService(dbus_service_name)
+        self.restore_committed_brightness()
+
+    # pylint: disable=invalid-name
+    def closeEvent(self, event: QCloseEvent | None) -> None:
+        """
+        Restores the committed brightness when the window is closed.
+        """
+
+        if event is not None:
+            event.ignore()
+        self.exit_window()
+
+    def reject(self) -> None:
+        """
+        Restores the committed brightness when Escape is pressed.
+        """
+
+        self.exit_window()
+
+    def apply_brightness(self) -> None:
+        """
+        Saves the current brightness value and applies it to the hardware.
+        If an earlier Apply is still pending, it is replaced.
+        """
+
+        self.apply_pending_value = self.get_slider_value()
+        ## The applied value supersedes any preview that has not started.
+        self.preview_pending_value = None
+        self.preview_timer.stop()
+        self.drain_agent_requests()
+
+    def drain_apply_mailbox(self) -> None:
+        """
+        Starts the pending Apply, unless an agent request is still in
+        flight. An in-flight preview could otherwise overwrite the applied
+        value.
+        """
+
+        if self.apply_pending_value is None:
+            return
+        if self.apply_proc is not None or self.preview_proc is not None:
+            return
+
+        self.apply_proc_value = self.apply_pending_value
+        self.apply_pending_value = None
+        self.apply_proc = QProcess(self)
+        self.apply_proc.finished.connect(self.apply_finished)
+        self.apply_proc.errorOccurred.connect(self.apply_error)
+        self.apply_proc.start(
+            agent_path,
+            ["set", *self.get_agent_value_args(self.apply_proc_value)],
+        )
+
+    def apply_finished(self) -> None:
+        """
+        Called when an Apply process exits. The agent prints the resulting
+        brightness of the preferred device, which can differ from the
+        requested value on drivers with few brightness levels. That value
+        becomes the committed one.
+        """
 
-        if set_bright_proc.returncode != 0:
-            error_window = ErrorWindow(
+        if self.apply_proc is None:
+            return
+        if (
+            self.apply_proc.exitStatus() != QProcess.NormalExit
+            or self.apply_proc.exitCode() != 0
+        ):
+            error_window: ErrorWindow = ErrorWindow(
                 "'/usr/bin/backlight-tool-dist-agent set "
-                f"{self.brightness_slider.value()}' was unable to set the "
+                + " ".join(self.get_agent_value_args(self.apply_proc_value))
+                + "' was unable to set the "
                 "system's display brightness!<br>"
                 "<br>"
                 "Please report this bug!<br>"
                 "<br>"
                 "Output from 'backlight-tool-dist-agent':<br>"
-                f"<pre>{set_bright_proc.stdout}"
-                f"{set_bright_proc.stderr}</pre>"
+                "<pre>"
+                + bytes(self.apply_proc.readAllStandardOutput()).decode(
+                    "utf-8", errors="replace"
+                )
+                + bytes(self.apply_proc.readAllStandardError()).decode(
+                    "utf-8", errors="replace"
+                )
+                + "</pre>"
             )
             error_window.exec_()
             sys.exit(1)
 
-        self.bright_int = self.brightness_slider.value()
+        applied_value: tuple[int, ...] = self.apply_proc_value
+        reply_str: str = (
+            bytes(self.apply_proc.readAllStandardOutput())
+            .decode("utf-8", errors="replace")
+            .strip()
+        )
+        if reply_str.isdigit() and 1 <= int(reply_str) <= 100:
+            applied_value = (int(reply_str), *applied_value[1:])
+        if (
+            applied_value != self.apply_proc_value
+            and self.apply_pending_value is None
+            and self.get_slider_value() == self.apply_proc_value
+        ):
+            self.syncing_sliders = True
+            self.slider_list[0].setValue(applied_value[0])
+            self.syncing_sliders = False
+
+        self.apply_proc.deleteLater()
+        self.apply_proc = None
+        self.bright_tuple = applied_value
+        self.preview_applied_value = applied_value
+        self.drain_agent_requests()
+
+    def apply_error(self, proc_error: QProcess.ProcessError) -> None:
+        """
+        Called if an Apply process fails. If it could not be started,
+        finished is never emitted, so report the error here.
+        """
+
+        if proc_error != QProcess.FailedToStart or self.apply_proc is None:
+            return
+        error_window: ErrorWindow = ErrorWindow(
+            "The application was unable to start "
+            "'/usr/bin/backlight-tool-dist-agent'!<br>"
+            "<br>"
+            "Please report this bug!<br>"
+            "<br>"
+            "Error details:<br>"
+            f"<pre>{self.apply_proc.errorString()}</pre>"
+        )
+        error_window.exec_()
+        sys.exit(1)
+
+
+class DBusAdaptor(QDBusAbstractAdaptor):
+    """
+    Lets a second launch of backlight-tool-dist show the window of the
+    running instance.
+    """
+
+    Q_CLASSINFO("D-Bus Interface", dbus_service_name)
+
+    # pylint: disable=invalid-name
+    @pyqtSlot()
+    def ShowWindow(self) -> None:
+        """
+        Shows and raises the parent window.
+        """
+
+        parent_obj: Any = self.parent()
+        assert isinstance(parent_obj, BacklightToolWindow)
+        parent_window: BacklightToolWindow = parent_obj
+        parent_window.showNormal()
+        parent_window.raise_()
+        parent_window.activateWindow()
 
 
 # pylint: disable=unused-argument
@@ -231,61 +906,40 @@ def main() -> NoReturn:
     timer.start(500)
     timer.timeout.connect(lambda: None)
 
-    error_window: ErrorWindow
-    try:
-        current_bright_proc: subprocess.CompletedProcess[str] = subprocess.run(
-            [
-                "/usr/bin/backlight-tool-dist-agent",
-                "get",
-            ],
-            check=False,
-            capture_output=True,
-            encoding="utf-8",
-        )
-    except Exception:
-        error_window = ErrorWindow(
-            "The application was unable to get the current display for an "
-            "unknown reason!<br>"
-            "<br>"
-            "Please report this bug!<br>"
-            "<br>"
-            "Error details:<br>"
-            f"<pre>{traceback.format_exc()}</pre>"
-        )
-        error_window.exec_()
-        sys.exit(1)
-
-    if current_bright_proc.returncode != 0:
-        error_window = ErrorWindow(
-            "'/usr/bin/backlight-tool-dist-agent get' was unable to get the "
-            "system's current backlight value! Possible causes:<br>"
-            "- The system does not support display brightness controls.<br>"
-            "- Your user account is not a member of the 'sudo' or "
-            "'privleap' groups.<br>"
-            "<br>"
-            "Output from 'backlight-tool-dist-agent':<br>"
-            f"<pre>{current_bright_proc.stdout}"
-            f"{current_bright_proc.stderr}</pre>"
-        )
-        error_window.exec_()
-        sys.exit(1)
-
-    current_bright_str: str = current_bright_proc.stdout.strip()
-
-    try:
-        current_bright_int: int = int(current_bright_str)
-    except Exception:
-        error_window = ErrorWindow(
-            "The system reported an invalid brightness value of "
-            f"'{current_bright_str}'!<br>"
-            "<br>"
-            "Please report this bug!"
-        )
-        error_window.exec_()
-        sys.exit(1)
-
-    window = BacklightToolWindow(current_bright_int)
+    ## Only one instance holds brightness state. This is checked before any
+    ## widget is built or the brightness is read, so a repeated launch exits
+    ## right away.
+    listening_on_dbus: bool = False
+    dbus_conn: QDBusConnection = QDBusConnection.sessionBus()
+    if dbus_conn.isConnected():
+        if not dbus_conn.registerService(dbus_service_name):
+            dbus_iface: QDBusInterface = QDBusInterface(
+                dbus_service_name,
+                dbus_object_path,
+                dbus_service_name,
+                dbus_conn,
+            )
+            if not dbus_iface.isValid():
+                print(
+                    "ERROR: Can't register D-Bus service, and service isn't "
+                    "running?",
+                    file=sys.stderr,
+                )
+                sys.exit(1)
+            dbus_iface.call("ShowWindow")
+            sys.exit(0)
+        listening_on_dbus = True
+    else:
+        ## Not fatal, only the single instance check is lost.
+        print("WARNING: D-Bus connection failed!", file=sys.stderr)
+
+    window: BacklightToolWindow = BacklightToolWindow()
+    if listening_on_dbus:
+        # pylint: disable=unused-variable
+        dbus_adaptor: DBusAdaptor = DBusAdaptor(window)
+        dbus_conn.registerObject(dbus_object_path, window)
     window.show()
+    window.start_brightness_fetch()
     app.exec_()
     sys.exit(0)
 
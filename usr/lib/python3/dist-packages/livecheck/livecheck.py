@@ -16,6 +16,7 @@ import select
 import subprocess
 import re
 import functools
+import time
 
 from pathlib import Path
 from typing import Tuple, Pattern, TextIO, NoReturn, Any
@@ -54,6 +55,26 @@ from PyQt5.QtDBus import (
 
 from term_colors.term_colors import TermColors
 
+from livecheck.logger import (
+    logger,
+    setup_logging,
+    dump_log_buffer,
+    write_log_buffer,
+)
+from livecheck.supervisor import (
+    helper_timeout_seconds,
+    run_helper,
+    request_lsblk_output,
+    cancel_running_helpers,
+    HelperBackoff,
+)
+from livecheck.metrics import livecheck_metrics
+from livecheck.rules import (
+    MountClassifier,
+    get_mount_classifier,
+    adjust_live_mode,
+)
+
 colors = TermColors()
 
 installer_monitor_dir: Path = Path("/var/lib/desktop-config-dist/livecheck")
@@ -474,6 +495,27 @@ its output could not be parsed.
 XXX_SCRIPT_OUTPUT_XXX
 Please report this bug!"""
 
+error_helper_timeout_text_gui: str = f"""{text_header_gui}<br/>
+<br/>
+<b><font color="red">ERROR</font></b>: The system's live state cannot be \
+determined!<br/>
+<br/>
+Technical information: The script <code>XXX_HELPER_SCRIPT_XXX</code> did \
+not finish within XXX_TIMEOUT_XXX seconds and was terminated. The live state \
+information is stale. Livecheck will retry automatically.<br/>
+<br/>
+Please report this bug!"""
+
+error_helper_timeout_text_cli: str = f"""{text_header_cli}
+
+{colors.bold}{colors.red}ERROR{colors.reset}: The system's live state cannot \
+be determined!
+
+Technical details: The script 'XXX_HELPER_SCRIPT_XXX' did not finish within
+XXX_TIMEOUT_XXX seconds and was terminated.
+
+Please report this bug!"""
+
 loading_tooltip: str = """Livecheck is loading information about the \
 system's persistence state..."""
 
@@ -512,6 +554,10 @@ information."""
 error_live_state_tooltip: str = """ERROR: The system's live state cannot be \
 determined. Click on the icon for more information."""
 
+stale_live_state_tooltip: str = """ERROR: The system's live state information \
+is stale, a helper script did not finish in time. Click on the icon for more \
+information."""
+
 
 # pylint: disable=too-few-public-methods
 class LiveTextWindow(QDialog):
@@ -632,7 +678,7 @@ class TrayUi(QObject):
         self.mount_checker.moveToThread(self.monitor_thread)
         self.monitor_thread.started.connect(self.mount_checker.monitor)
         self.monitor_thread.start()
-        print("INFO: Livecheck started.", file=sys.stderr)
+        logger.info("Livecheck started.")
 
     def handle_systray_click(
         self,
@@ -717,20 +763,18 @@ class TrayUi(QObject):
         """
 
         if installer_monitor_file.is_file():
-            print(
-                "INFO: Installer monitor file "
-                f"('{str(installer_monitor_file)}') was written by an "
-                "external process.",
-                file=sys.stderr,
+            logger.info(
+                "Installer monitor file ('%s') was written by an external "
+                "process.",
+                installer_monitor_file,
             )
             self.os_install_active = True
             self.update_mount_state("installing-distribution", "", "")
         else:
-            print(
-                "INFO: Installer monitor file "
-                f"('{str(installer_monitor_file)}') was deleted by an "
-                "external process.",
-                file=sys.stderr,
+            logger.info(
+                "Installer monitor file ('%s') was deleted by an external "
+                "process.",
+                installer_monitor_file,
             )
             self.os_install_active = False
             self.update_mount_state(
@@ -752,15 +796,14 @@ class TrayUi(QObject):
         system's "live" state from Livecheck's perspective.
         """
 
-        print("INFO: Mount state updated.", file=sys.stderr)
-        print(f"INFO: live_mode_str: '{live_mode_str}'", file=sys.stderr)
-        print(
-            f"INFO: live_check_str_one: '{live_check_str_one}'",
-            file=sys.stderr,
-        )
-        print(
-            f"INFO: live_check_str_two: '{live_check_str_two}'",
-            file=sys.stderr,
+        ## Formatting is deferred until the record is actually written out,
+        ## which by default only happens if the log buffer is dumped.
+        logger.info(
+            "Mount state updated. live_mode_str: '%s', live_check_str_one: "
+            "'%s', live_check_str_two: '%s'",
+            live_mode_str,
+            live_check_str_one,
+            live_check_str_two,
         )
 
         ## Clean up an unsightly historical artifact from live-mode.sh
@@ -888,6 +931,16 @@ class TrayUi(QObject):
                 )
                 self.tray_icon.setToolTip(error_live_state_tooltip)
                 self.tray_icon.setIcon(QIcon(icon_base_path + error_icon))
+            case "error-helper-timeout":
+                self.active_text = error_helper_timeout_text_gui.replace(
+                    "XXX_HELPER_SCRIPT_XXX",
+                    live_check_str_one,
+                ).replace(
+                    "XXX_TIMEOUT_XXX",
+                    live_check_str_two,
+                )
+                self.tray_icon.setToolTip(stale_live_state_tooltip)
+                self.tray_icon.setIcon(QIcon(icon_base_path + error_icon))
 
         if self.prev_live_state != "loading":
             if live_mode_str not in ("iso-live", "grub-live", "persistent"):
@@ -907,11 +960,14 @@ class TrayUi(QObject):
 
         self.prev_live_state = live_mode_str
 
+        livecheck_metrics.record_state(live_mode_str)
+        livecheck_metrics.write_textfile()
+
 
-# pylint: disable=too-few-public-methods
 class DBusAdaptor(QDBusAbstractAdaptor):
     """
-    Exposes TrayUi's show_live_mode_text_window method as a D-Bus method.
+    Exposes TrayUi's show_live_mode_text_window method, the contents of the
+    log buffer and livecheck's metrics as D-Bus methods.
     """
 
     Q_CLASSINFO("D-Bus Interface", "com.kicksecure.livecheck")
@@ -931,6 +987,24 @@ class DBusAdaptor(QDBusAbstractAdaptor):
         parent_tray_ui: TrayUi = parent_obj
         parent_tray_ui.show_live_mode_text_window()
 
+    # pylint: disable=invalid-name
+    @pyqtSlot(result=str)
+    def DumpLog(self) -> str:
+        """
+        Returns the contents of the in-memory log buffer.
+        """
+
+        return dump_log_buffer()
+
+    # pylint: disable=invalid-name
+    @pyqtSlot(result=str)
+    def GetMetrics(self) -> str:
+        """
+        Returns livecheck's metrics in the Prometheus text format.
+        """
+
+        return livecheck_metrics.render()
+
 
 class MountChecker(QObject):
     """
@@ -951,23 +1025,24 @@ class MountChecker(QObject):
         NFS).
 
         The first returned value is the integer '0' on success, '1' on
-        failure, or '2' if the script succeeded but its output could not be
-        processed. The second value is either a list of safe writable
-        filesystems, or the output of the script if an error was encountered.
-        The third value is either a list of unsafe writable filesystems, or
-        the exit code of the script if an error was encountered.
+        failure, '2' if the script succeeded but its output could not be
+        processed, or '3' if the script timed out. The second value is either
+        a list of safe writable filesystems, the output of the script if an
+        error was encountered, or the path of the script if it timed out. The
+        third value is either a list of unsafe writable filesystems, the exit
+        code of the script if an error was encountered, or the timeout in
+        seconds if it timed out.
         """
 
         safe_writable_fs_list: list[str] = []
         unsafe_writable_fs_list: list[str] = []
-        gwfl_proc: subprocess.CompletedProcess[str] = subprocess.run(
-            [
-                "/usr/libexec/helper-scripts/get_writable_fs_lists.sh",
-            ],
-            capture_output=True,
-            encoding="utf-8",
-            check=False,
-        )
+        gwfl_path: str = "/usr/libexec/helper-scripts/get_writable_fs_lists.sh"
+        try:
+            gwfl_proc: subprocess.CompletedProcess[str] = run_helper(
+                [gwfl_path]
+            )
+        except subprocess.TimeoutExpired:
+            return (3, gwfl_path, str(helper_timeout_seconds))
         if gwfl_proc.returncode != 0:
             return (
                 1,
@@ -1035,6 +1110,9 @@ class MountChecker(QObject):
               output_of_get_writable_fs_lists,
               return_code_of_get_writable_fs_lists). Same as above, but for
               get-writable-fs-lists.sh.
+            * ("error-helper-timeout", path_of_script, timeout_in_seconds).
+              This is returned if either script did not finish in time and
+              was killed.
 
         The argument (in_cli_mode) dictates whether the strings containing the
         filesystem lists are formatted using HTML or plain-text. HTML is
@@ -1042,12 +1120,18 @@ class MountChecker(QObject):
         the CLI.
         """
 
-        live_check_process: subprocess.CompletedProcess[str] = subprocess.run(
-            ["/usr/libexec/helper-scripts/live-mode.sh"],
-            capture_output=True,
-            text=True,
-            check=False,
-        )
+        live_mode_path: str = "/usr/libexec/helper-scripts/live-mode.sh"
+        request_lsblk_output()
+        try:
+            live_check_process: subprocess.CompletedProcess[str] = run_helper(
+                [live_mode_path]
+            )
+        except subprocess.TimeoutExpired:
+            return (
+                "error-helper-timeout",
+                live_mode_path,
+                str(helper_timeout_seconds),
+            )
         if live_check_process.returncode != 0:
             return (
                 "error-live-mode",
@@ -1082,14 +1166,32 @@ class MountChecker(QObject):
                         writable_fs_list_data[1],
                         writable_fs_list_data[2],
                     )
+                if writable_fs_list_data[0] == 3:
+                    assert isinstance(writable_fs_list_data[1], str)
+                    assert isinstance(writable_fs_list_data[2], str)
+                    return (
+                        "error-helper-timeout",
+                        writable_fs_list_data[1],
+                        writable_fs_list_data[2],
+                    )
                 assert isinstance(writable_fs_list_data[1], list)
                 assert isinstance(writable_fs_list_data[2], list)
+                ## Apply the administrator's classification rules from
+                ## /etc/livecheck.d, if any.
+                mount_classifier: MountClassifier = get_mount_classifier()
+                safe_fs_list, danger_fs_list = mount_classifier.reclassify(
+                    writable_fs_list_data[1], writable_fs_list_data[2]
+                )
+                if mount_classifier.rule_count != 0:
+                    live_mode_str = adjust_live_mode(
+                        live_mode_str, len(safe_fs_list), len(danger_fs_list)
+                    )
                 safe_fs_str: str = ""
                 danger_fs_str: str = ""
                 if in_cli_mode:
-                    for safe_fs in writable_fs_list_data[1]:
+                    for safe_fs in safe_fs_list:
                         safe_fs_str += f"  - {safe_fs}\n"
-                    for danger_fs in writable_fs_list_data[2]:
+                    for danger_fs in danger_fs_list:
                         danger_fs_str += f"  - {danger_fs}\n"
                     if safe_fs_str == "":
                         safe_fs_str = "  - none"
@@ -1098,9 +1200,9 @@ class MountChecker(QObject):
                     safe_fs_str = safe_fs_str.strip("\n")
                     danger_fs_str = danger_fs_str.strip("\n")
                 else:
-                    for safe_fs in writable_fs_list_data[1]:
+                    for safe_fs in safe_fs_list:
                         safe_fs_str += f"<li>{safe_fs}</li>"
-                    for danger_fs in writable_fs_list_data[2]:
+                    for danger_fs in danger_fs_list:
                         danger_fs_str += f"<li>{danger_fs}</li>"
                     if safe_fs_str == "":
                         safe_fs_str = "<li>none</li>"
@@ -1118,8 +1220,15 @@ class MountChecker(QObject):
         Monitors the system for mount changes. This function is blocking and
         does not terminate, so it must be run in a separate thread. This is
         only for use in Livecheck's GUI mode.
+
+        If the live state cannot be determined, the check is retried with
+        exponential backoff. Mount changes that happen during the backoff
+        period are coalesced into the retry, rather than each one re-running
+        the failing helpers.
         """
 
+        helper_backoff: HelperBackoff = HelperBackoff()
+
         # pylint: disable=consider-using-with
         mount_file: TextIO = open("/proc/self/mounts", "r", encoding="utf-8")
         mount_poll: select.poll = select.poll()
@@ -1134,15 +1243,32 @@ class MountChecker(QObject):
         while True:
             mount_file.seek(0)
             mount_file.read()
+            detection_start: float = time.monotonic()
             live_state_info: Tuple[str, str, str] = self.get_live_state_info(
                 in_cli_mode=False
             )
+            livecheck_metrics.record_detection(
+                time.monotonic() - detection_start, live_state_info[0]
+            )
             self.mountStateChanged.emit(
                 live_state_info[0],
                 live_state_info[1],
                 live_state_info[2],
             )
+            if live_state_info[0].startswith("error-"):
+                helper_backoff.record_failure()
+                retry_delay: float = helper_backoff.delay()
+                logger.warning(
+                    "Could not determine live state ('%s'), retrying in %s "
+                    "seconds.",
+                    live_state_info[0],
+                    retry_delay,
+                )
+                time.sleep(retry_delay)
+                continue
+            helper_backoff.record_success()
             mount_poll.poll()
+            livecheck_metrics.record_mount_event()
 
 
 # pylint: disable=unused-argument
@@ -1151,10 +1277,20 @@ def signal_handler(sig: int, frame: FrameType | None) -> None:
     Handles signals.
     """
 
-    print(f"INFO: Signal '{sig}' received, exiting.", file=sys.stderr)
+    logger.info("Signal '%s' received, exiting.", sig)
+    cancel_running_helpers()
     sys.exit(128 + sig)
 
 
+# pylint: disable=unused-argument
+def dump_log_signal_handler(sig: int, frame: FrameType | None) -> None:
+    """
+    Handles SIGUSR1 by writing out the in-memory log buffer.
+    """
+
+    write_log_buffer()
+
+
 def main_gui(show_window: bool) -> NoReturn:
     """
     Launches the Livecheck GUI.
@@ -1166,6 +1302,7 @@ def main_gui(show_window: bool) -> NoReturn:
 
     signal.signal(signal.SIGTERM, signal_handler)
     signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGUSR1, dump_log_signal_handler)
 
     timer: QTimer = QTimer()
     timer.start(500)
@@ -1182,9 +1319,8 @@ def main_gui(show_window: bool) -> NoReturn:
                 dbus_conn,
             )
             if not dbus_iface.isValid():
-                print(
-                    "Can't register D-Bus service, and service isn't running?",
-                    file=sys.stderr,
+                logger.error(
+                    "Can't register D-Bus service, and service isn't running?"
                 )
                 sys.exit(1)
 
@@ -1198,7 +1334,7 @@ def main_gui(show_window: bool) -> NoReturn:
 
         listening_on_dbus = True
     else:
-        print("D-Bus connection failed!", file=sys.stderr)
+        logger.error("D-Bus connection failed!")
         ## Don't treat this as a fatal error, we can still operate, albeit in
         ## a degraded state.
 
@@ -1314,6 +1450,16 @@ def main_cli() -> NoReturn:
                     live_check_str_one,
                 )
             )
+        case "error-helper-timeout":
+            print(
+                error_helper_timeout_text_cli.replace(
+                    "XXX_HELPER_SCRIPT_XXX",
+                    live_check_str_one,
+                ).replace(
+                    "XXX_TIMEOUT_XXX",
+                    live_check_str_two,
+                )
+            )
 
     if live_mode_str.startswith("error-"):
         sys.exit(1)
@@ -1328,6 +1474,7 @@ def main() -> NoReturn:
     use_gui_mode: bool = False
     mode_chosen: bool = False
     show_window: bool = False
+    verbose: bool = False
 
     for arg in sys.argv[1:]:
         match arg:
@@ -1339,6 +1486,8 @@ def main() -> NoReturn:
                 mode_chosen = True
             case "--show-window":
                 show_window = True
+            case "--verbose":
+                verbose = True
             case _:
                 print(
                     f"ERROR: Unrecognized argument '{sys.argv[1]}'!",
@@ -1359,6 +1508,10 @@ def main() -> NoReturn:
         )
         sys.exit(1)
 
+    setup_logging(verbose=verbose)
+    ## Compile the mount classification rules once, up front.
+    get_mount_classifier()
+
     if use_gui_mode:
         main_gui(show_window=show_window)
     else:
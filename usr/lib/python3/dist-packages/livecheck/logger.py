@@ -0,0 +1,219 @@
+#!/usr/bin/python3 -su
+
+# Copyright (C) 2026 - 2026 ENCRYPTED SUPPORT LLC <adrelanos@whonix.org>
+# See the file COPYING for copying conditions.
+
+"""
+logger.py - Logging setup for livecheck. Log records are kept in an
+in-memory ring buffer and forwarded to the systemd journal using its native
+protocol, or to stderr if the journal is not available.
+"""
+
+import collections
+import logging
+import os
+import socket
+import struct
+import sys
+
+journal_socket_path: str = "/run/systemd/journal/socket"
+ring_buffer_capacity: int = 512
+log_format: str = "%(levelname)s: %(message)s"
+ring_buffer_format: str = "%(asctime)s %(levelname)s: %(message)s"
+
+## Mapping of Python logging levels to syslog priorities, as expected by the
+## PRIORITY field of the journal.
+journal_priority_dict: dict[int, int] = {
+    logging.CRITICAL: 2,
+    logging.ERROR: 3,
+    logging.WARNING: 4,
+    logging.INFO: 6,
+    logging.DEBUG: 7,
+}
+
+log_level_dict: dict[str, int] = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+logger: logging.Logger = logging.getLogger("livecheck")
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    Keeps the most recent log records in memory. Records are only formatted
+    when the buffer is dumped, so storing a record costs no I/O.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """
+        Init function.
+        """
+
+        super().__init__()
+        self.records: collections.deque[logging.LogRecord] = (
+            collections.deque(maxlen=capacity)
+        )
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        Stores a record, evicting the oldest one if the buffer is full.
+        """
+
+        self.records.append(record)
+
+    def dump(self) -> str:
+        """
+        Returns all buffered records, formatted, oldest first.
+        """
+
+        self.acquire()
+        try:
+            record_list: list[logging.LogRecord] = list(self.records)
+        finally:
+            self.release()
+        return "\n".join(self.format(record) for record in record_list)
+
+
+class JournalHandler(logging.Handler):
+    """
+    Sends log records to systemd-journald using the native journal protocol.
+    Each record becomes a single datagram with structured fields, rather
+    than a line of text on a stream.
+    """
+
+    def __init__(self, identifier: str) -> None:
+        """
+        Init function.
+        """
+
+        super().__init__()
+        self.identifier: str = identifier
+        self.journal_socket: socket.socket = socket.socket(
+            socket.AF_UNIX, socket.SOCK_DGRAM
+        )
+        self.journal_socket.connect(journal_socket_path)
+
+    @staticmethod
+    def encode_field(key: str, value: str) -> bytes:
+        """
+        Encodes a single journal field. Values containing a newline must use
+        the length-prefixed binary form.
+        """
+
+        value_bytes: bytes = value.encode("utf-8", errors="replace")
+        if b"\n" in value_bytes:
+            return (
+                key.encode("ascii")
+                + b"\n"
+                + struct.pack("<Q", len(value_bytes))
+                + value_bytes
+                + b"\n"
+            )
+        return key.encode("ascii") + b"=" + value_bytes + b"\n"
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        Sends a record to the journal.
+        """
+
+        try:
+            message_bytes: bytes = b"".join(
+                (
+                    self.encode_field("MESSAGE", self.format(record)),
+                    self.encode_field(
+                        "PRIORITY",
+                        str(journal_priority_dict.get(record.levelno, 6)),
+                    ),
+                    self.encode_field("SYSLOG_IDENTIFIER", self.identifier),
+                    self.encode_field("CODE_FILE", record.pathname),
+                    self.encode_field("CODE_LINE", str(record.lineno)),
+                    self.encode_field("CODE_FUNC", record.funcName),
+                )
+            )
+            self.journal_socket.send(message_bytes)
+        except Exception:  # pylint: disable=broad-exception-caught
+            self.handleError(record)
+
+    def close(self) -> None:
+        """
+        Closes the journal socket.
+        """
+
+        self.journal_socket.close()
+        super().close()
+
+
+ring_buffer_handler: RingBufferHandler = RingBufferHandler(
+    ring_buffer_capacity
+)
+output_handler: logging.Handler = logging.StreamHandler(sys.stderr)
+
+
+def setup_logging(verbose: bool) -> None:
+    """
+    Configures the livecheck logger. INFO and DEBUG records are always kept
+    in the ring buffer, but are only written out if verbose logging is
+    requested (either with the verbose argument, or by setting
+    LIVECHECK_LOG_LEVEL). Otherwise only warnings and errors cause any I/O.
+    """
+
+    # pylint: disable=global-statement
+    global output_handler
+
+    output_level: int = logging.WARNING
+    if verbose:
+        output_level = logging.INFO
+    env_level_str: str = os.environ.get("LIVECHECK_LOG_LEVEL", "").lower()
+    if env_level_str in log_level_dict:
+        output_level = log_level_dict[env_level_str]
+
+    ## JOURNAL_STREAM is set by systemd if stderr is connected to the
+    ## journal. In that case, talk to the journal directly instead.
+    if "JOURNAL_STREAM" in os.environ:
+        try:
+            output_handler = JournalHandler("livecheck")
+        except OSError:
+            output_handler = logging.StreamHandler(sys.stderr)
+
+    output_handler.setLevel(output_level)
+    output_handler.setFormatter(logging.Formatter(log_format))
+    ring_buffer_handler.setLevel(min(output_level, logging.INFO))
+    ring_buffer_handler.setFormatter(logging.Formatter(ring_buffer_format))
+
+    logger.setLevel(min(output_level, logging.INFO))
+    logger.propagate = False
+    logger.addHandler(ring_buffer_handler)
+    logger.addHandler(output_handler)
+
+
+def dump_log_buffer() -> str:
+    """
+    Returns the contents of the in-memory log ring buffer.
+    """
+
+    return ring_buffer_handler.dump()
+
+
+def write_log_buffer() -> None:
+    """
+    Writes the contents of the in-memory log ring buffer to the configured
+    output (the journal or stderr), regardless of the output log level.
+    """
+
+    buffer_str: str = dump_log_buffer()
+    if isinstance(output_handler, JournalHandler):
+        record: logging.LogRecord = logger.makeRecord(
+            logger.name,
+            logging.INFO,
+            __file__,
+            0,
+            "Log buffer dump:\n%s",
+            (buffer_str,),
+            None,
+        )
+        output_handler.emit(record)
+    else:
+        print(f"Log buffer dump:\n{buffer_str}", file=sys.stderr)
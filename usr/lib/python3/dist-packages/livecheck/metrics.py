@@ -0,0 +1,257 @@
+#!/usr/bin/python3 -su
+
+# Copyright (C) 2026 - 2026 ENCRYPTED SUPPORT LLC <adrelanos@whonix.org>
+# See the file COPYING for copying conditions.
+
+"""
+metrics.py - In-process counters and latency histograms for livecheck,
+rendered in the Prometheus text exposition format.
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+from pathlib import Path
+
+from livecheck.logger import logger
+
+## Upper bounds (in seconds) of the detection latency histogram buckets.
+detection_bucket_tuple: tuple[float, ...] = (
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    20.0,
+)
+
+metrics_file_name: str = "metrics.prom"
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. Observing a value is a linear scan over a dozen
+    buckets, no allocation is done.
+    """
+
+    def __init__(self, bucket_tuple: tuple[float, ...]) -> None:
+        """
+        Init function.
+        """
+
+        self.bucket_tuple: tuple[float, ...] = bucket_tuple
+        self.bucket_count_list: list[int] = [0] * len(bucket_tuple)
+        self.sum: float = 0.0
+        self.count: int = 0
+
+    def observe(self, value: float) -> None:
+        """
+        Records a single observation.
+        """
+
+        for bucket_idx, bucket_bound in enumerate(self.bucket_tuple):
+            if value <= bucket_bound:
+                self.bucket_count_list[bucket_idx] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str) -> list[str]:
+        """
+        Returns the exposition lines for this histogram. Bucket counts are
+        cumulative, as required by the format.
+        """
+
+        line_list: list[str] = []
+        cumulative_count: int = 0
+        for bucket_bound, bucket_count in zip(
+            self.bucket_tuple, self.bucket_count_list
+        ):
+            cumulative_count += bucket_count
+            line_list.append(
+                f'{name}_bucket{{le="{bucket_bound}"}} {cumulative_count}'
+            )
+        line_list.append(f'{name}_bucket{{le="+Inf"}} {self.count}')
+        line_list.append(f"{name}_sum {self.sum:.6f}")
+        line_list.append(f"{name}_count {self.count}")
+        return line_list
+
+
+# pylint: disable=too-many-instance-attributes
+class LivecheckMetrics:
+    """
+    Collects livecheck's metrics. Updated from both the monitor thread and
+    the GUI thread, so all access goes through a lock.
+    """
+
+    def __init__(self) -> None:
+        """
+        Init function.
+        """
+
+        self.lock: threading.Lock = threading.Lock()
+        self.mount_events_total: int = 0
+        self.recomputes_total: int = 0
+        self.failures_total_dict: dict[str, int] = {}
+        self.detection_histogram: Histogram = Histogram(detection_bucket_tuple)
+        self.state_seconds_total_dict: dict[str, float] = {}
+        self.state_transitions_total: int = 0
+        self.current_state: str = "loading"
+        self.current_state_since_monotonic: float = time.monotonic()
+        self.current_state_since_wall: float = time.time()
+
+    def record_mount_event(self) -> None:
+        """
+        Records a change to the mount table.
+        """
+
+        with self.lock:
+            self.mount_events_total += 1
+
+    def record_detection(self, duration: float, live_state: str) -> None:
+        """
+        Records one run of the live state detection and how long it took.
+        """
+
+        with self.lock:
+            self.recomputes_total += 1
+            self.detection_histogram.observe(duration)
+            if live_state.startswith("error-"):
+                self.failures_total_dict[live_state] = (
+                    self.failures_total_dict.get(live_state, 0) + 1
+                )
+
+    def record_state(self, live_state: str) -> None:
+        """
+        Records the live state shown to the user, accumulating the time spent
+        in the previous state.
+        """
+
+        with self.lock:
+            if live_state == self.current_state:
+                return
+            now_monotonic: float = time.monotonic()
+            self.state_seconds_total_dict[self.current_state] = (
+                self.state_seconds_total_dict.get(self.current_state, 0.0)
+                + now_monotonic
+                - self.current_state_since_monotonic
+            )
+            self.state_transitions_total += 1
+            self.current_state = live_state
+            self.current_state_since_monotonic = now_monotonic
+            self.current_state_since_wall = time.time()
+
+    def render(self) -> str:
+        """
+        Returns all metrics in the Prometheus text exposition format. The
+        dwell time of the current state is included up to the present.
+        """
+
+        with self.lock:
+            line_list: list[str] = [
+                "# HELP livecheck_mount_events_total Mount table changes "
+                "seen by livecheck.",
+                "# TYPE livecheck_mount_events_total counter",
+                f"livecheck_mount_events_total {self.mount_events_total}",
+                "# HELP livecheck_recomputes_total Live state detection "
+                "runs.",
+                "# TYPE livecheck_recomputes_total counter",
+                f"livecheck_recomputes_total {self.recomputes_total}",
+                "# HELP livecheck_detection_failures_total Live state "
+                "detection runs that failed, by error state.",
+                "# TYPE livecheck_detection_failures_total counter",
+            ]
+            for error_state, failure_count in sorted(
+                self.failures_total_dict.items()
+            ):
+                line_list.append(
+                    "livecheck_detection_failures_total"
+                    f'{{state="{error_state}"}} {failure_count}'
+                )
+            line_list.extend(
+                [
+                    "# HELP livecheck_detection_seconds Time taken by live "
+                    "state detection.",
+                    "# TYPE livecheck_detection_seconds histogram",
+                ]
+            )
+            line_list.extend(
+                self.detection_histogram.render("livecheck_detection_seconds")
+            )
+
+            state_seconds_dict: dict[str, float] = dict(
+                self.state_seconds_total_dict
+            )
+            state_seconds_dict[self.current_state] = (
+                state_seconds_dict.get(self.current_state, 0.0)
+                + time.monotonic()
+                - self.current_state_since_monotonic
+            )
+            line_list.extend(
+                [
+                    "# HELP livecheck_state_seconds_total Time spent in each "
+                    "live state.",
+                    "# TYPE livecheck_state_seconds_total counter",
+                ]
+            )
+            for live_state, state_seconds in sorted(
+                state_seconds_dict.items()
+            ):
+                line_list.append(
+                    f'livecheck_state_seconds_total{{state="{live_state}"}} '
+                    f"{state_seconds:.3f}"
+                )
+            line_list.extend(
+                [
+                    "# HELP livecheck_state_transitions_total Live state "
+                    "changes.",
+                    "# TYPE livecheck_state_transitions_total counter",
+                    "livecheck_state_transitions_total "
+                    f"{self.state_transitions_total}",
+                    "# HELP livecheck_state Current live state.",
+                    "# TYPE livecheck_state gauge",
+                    f'livecheck_state{{state="{self.current_state}"}} 1',
+                    "# HELP livecheck_state_since_timestamp_seconds Time the "
+                    "current live state was entered.",
+                    "# TYPE livecheck_state_since_timestamp_seconds gauge",
+                    "livecheck_state_since_timestamp_seconds "
+                    f"{self.current_state_since_wall:.3f}",
+                ]
+            )
+
+        return "\n".join(line_list) + "\n"
+
+    def write_textfile(self) -> None:
+        """
+        Atomically writes the metrics to $XDG_RUNTIME_DIR/livecheck, where a
+        textfile collector can pick them up.
+        """
+
+        runtime_dir_str: str = os.environ.get("XDG_RUNTIME_DIR", "")
+        if runtime_dir_str == "":
+            return
+        metrics_dir: Path = Path(runtime_dir_str) / "livecheck"
+        metrics_str: str = self.render()
+        try:
+            metrics_dir.mkdir(mode=0o700, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w",
+                encoding="utf-8",
+                dir=metrics_dir,
+                prefix=".metrics.",
+                delete=False,
+            ) as metrics_tmp_file:
+                metrics_tmp_file.write(metrics_str)
+            os.replace(metrics_tmp_file.name, metrics_dir / metrics_file_name)
+        except OSError as metrics_error:
+            logger.warning("Could not write metrics file: %s", metrics_error)
+
+
+livecheck_metrics: LivecheckMetrics = LivecheckMetrics()
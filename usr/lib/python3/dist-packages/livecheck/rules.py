@@ -0,0 +1,388 @@
+#!/usr/bin/python3 -su
+
+# Copyright (C) 2026 - 2026 ENCRYPTED SUPPORT LLC <adrelanos@whonix.org>
+# See the file COPYING for copying conditions.
+
+"""
+rules.py - Administrator-defined rules that override whether a writable
+mount is considered "safe", "unsafe", or is ignored entirely. Rules are read
+from /etc/livecheck.d/*.conf and compiled into a mount path prefix trie plus
+hash lookups by filesystem type and source device, so classifying a mount
+does not require testing every rule.
+"""
+
+import configparser
+import functools
+import re
+
+from pathlib import Path
+from typing import Callable, Pattern
+
+from livecheck.logger import logger
+
+rule_config_dir: Path = Path("/etc/livecheck.d")
+mounts_file: Path = Path("/proc/self/mounts")
+sys_block_dir: Path = Path("/sys/class/block")
+
+rule_action_tuple: tuple[str, ...] = ("safe", "unsafe", "ignore")
+octal_escape_re: Pattern[str] = re.compile(r"\\([0-7]{3})")
+
+
+def decode_mount_field(field_str: str) -> str:
+    """
+    Decodes the octal escapes (i.e. '\\040' for a space) used in
+    /proc/self/mounts.
+    """
+
+    return octal_escape_re.sub(
+        lambda escape_match: chr(int(escape_match.group(1), 8)), field_str
+    )
+
+
+def split_path(path_str: str) -> list[str]:
+    """
+    Splits an absolute path into its components, ignoring empty components.
+    """
+
+    return [component for component in path_str.split("/") if component]
+
+
+# pylint: disable=too-few-public-methods
+class MountRule:
+    """
+    A single classification rule. Every condition that is set must match.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self,
+        name: str,
+        action: str,
+        path_prefix: str | None,
+        fs_type: str | None,
+        source: str | None,
+        removable: bool | None,
+    ) -> None:
+        """
+        Init function.
+        """
+
+        self.name: str = name
+        self.action: str = action
+        self.path_prefix: str | None = path_prefix
+        self.fs_type: str | None = fs_type
+        self.source: str | None = source
+        self.removable: bool | None = removable
+
+    def matches(
+        self,
+        fs_type: str,
+        source: str,
+        removable_func: Callable[[], bool],
+    ) -> bool:
+        """
+        Checks the non-path conditions of the rule. The path condition is
+        already satisfied by the trie lookup. Removable media detection hits
+        sysfs, so it is only done if the rule asks for it.
+        """
+
+        if self.fs_type is not None and self.fs_type != fs_type:
+            return False
+        if self.source is not None and self.source != source:
+            return False
+        if self.removable is not None and self.removable != removable_func():
+            return False
+        return True
+
+
+class PrefixTrieNode:
+    """
+    A node of the mount path prefix trie.
+    """
+
+    __slots__ = ("child_dict", "rule_list")
+
+    def __init__(self) -> None:
+        """
+        Init function.
+        """
+
+        self.child_dict: dict[str, PrefixTrieNode] = {}
+        self.rule_list: list[MountRule] = []
+
+
+class MountClassifier:
+    """
+    Compiled form of the rule set.
+    """
+
+    def __init__(self, rule_list: list[MountRule]) -> None:
+        """
+        Compiles a list of rules. Rules with a path prefix go into the trie,
+        other rules are indexed by filesystem type or source device, and
+        rules with none of these conditions are checked last.
+        """
+
+        self.rule_count: int = len(rule_list)
+        self.trie_root: PrefixTrieNode = PrefixTrieNode()
+        self.fs_type_dict: dict[str, list[MountRule]] = {}
+        self.source_dict: dict[str, list[MountRule]] = {}
+        self.generic_rule_list: list[MountRule] = []
+
+        for rule in rule_list:
+            if rule.path_prefix is not None:
+                trie_node: PrefixTrieNode = self.trie_root
+                for component in split_path(rule.path_prefix):
+                    trie_node = trie_node.child_dict.setdefault(
+                        component, PrefixTrieNode()
+                    )
+                trie_node.rule_list.append(rule)
+            elif rule.fs_type is not None:
+                self.fs_type_dict.setdefault(rule.fs_type, []).append(rule)
+            elif rule.source is not None:
+                self.source_dict.setdefault(rule.source, []).append(rule)
+            else:
+                self.generic_rule_list.append(rule)
+
+    def classify(
+        self, mount_point: str, fs_type: str, source: str
+    ) -> str | None:
+        """
+        Returns the action of the most specific matching rule ("safe",
+        "unsafe" or "ignore"), or None if no rule matches. Rules with a
+        longer path prefix take precedence, then rules matched by
+        filesystem type, source device, and finally generic rules.
+        """
+
+        path_rule_list_list: list[list[MountRule]] = [
+            self.trie_root.rule_list
+        ]
+        trie_node: PrefixTrieNode = self.trie_root
+        for component in split_path(mount_point):
+            next_node: PrefixTrieNode | None = trie_node.child_dict.get(
+                component
+            )
+            if next_node is None:
+                break
+            trie_node = next_node
+            path_rule_list_list.append(trie_node.rule_list)
+
+        removable_func: Callable[[], bool] = functools.partial(
+            is_removable_source, source
+        )
+        for candidate_rule_list in (
+            *reversed(path_rule_list_list),
+            self.fs_type_dict.get(fs_type, []),
+            self.source_dict.get(source, []),
+            self.generic_rule_list,
+        ):
+            for rule in candidate_rule_list:
+                if rule.matches(fs_type, source, removable_func):
+                    return rule.action
+        return None
+
+    def reclassify(
+        self, safe_fs_list: list[str], unsafe_fs_list: list[str]
+    ) -> tuple[list[str], list[str]]:
+        """
+        Applies the rules to the writable filesystem lists reported by
+        get_writable_fs_lists.sh, in one pass over the mounts.
+        """
+
+        if self.rule_count == 0:
+            return (safe_fs_list, unsafe_fs_list)
+
+        mount_info_dict: dict[str, tuple[str, str]] = read_mount_info()
+        new_safe_fs_list: list[str] = []
+        new_unsafe_fs_list: list[str] = []
+        for default_action, fs_list in (
+            ("safe", safe_fs_list),
+            ("unsafe", unsafe_fs_list),
+        ):
+            for mount_point in fs_list:
+                source, fs_type = mount_info_dict.get(mount_point, ("", ""))
+                action: str | None = self.classify(
+                    mount_point, fs_type, source
+                )
+                if action is None:
+                    action = default_action
+                if action == "safe":
+                    new_safe_fs_list.append(mount_point)
+                elif action == "unsafe":
+                    new_unsafe_fs_list.append(mount_point)
+        return (new_safe_fs_list, new_unsafe_fs_list)
+
+
+def read_mount_info() -> dict[str, tuple[str, str]]:
+    """
+    Returns a dictionary mapping mount points to their source device and
+    filesystem type. If a mount point is mounted over, the topmost mount
+    wins.
+    """
+
+    mount_info_dict: dict[str, tuple[str, str]] = {}
+    try:
+        mounts_str: str = mounts_file.read_text(encoding="utf-8")
+    except OSError:
+        return mount_info_dict
+    for mount_line in mounts_str.splitlines():
+        mount_field_list: list[str] = mount_line.split(" ")
+        if len(mount_field_list) < 3:
+            continue
+        mount_info_dict[decode_mount_field(mount_field_list[1])] = (
+            decode_mount_field(mount_field_list[0]),
+            mount_field_list[2],
+        )
+    return mount_info_dict
+
+
+@functools.cache
+def is_removable_source(source: str) -> bool:
+    """
+    Checks whether the block device a filesystem is mounted from is marked as
+    removable. Partitions don't have a 'removable' attribute of their own, so
+    the parent device is checked as well.
+    """
+
+    if not source.startswith("/dev/"):
+        return False
+    try:
+        device_name: str = Path(source).resolve().name
+        device_dir: Path = (sys_block_dir / device_name).resolve()
+    except OSError:
+        return False
+    for removable_file in (
+        device_dir / "removable",
+        device_dir.parent / "removable",
+    ):
+        try:
+            return removable_file.read_text(encoding="utf-8").strip() == "1"
+        except OSError:
+            continue
+    return False
+
+
+def parse_rule_section(
+    section_name: str, section: configparser.SectionProxy
+) -> MountRule | None:
+    """
+    Parses a single '[rule:NAME]' section. Returns None if the rule is
+    invalid.
+    """
+
+    rule_name: str = section_name.split(":", maxsplit=1)[1]
+    action: str = section.get("Action", "").strip().lower()
+    if action not in rule_action_tuple:
+        logger.warning(
+            "Rule '%s' has invalid or missing Action '%s', ignoring it.",
+            rule_name,
+            action,
+        )
+        return None
+
+    path_prefix: str | None = section.get("Path")
+    if path_prefix is not None and not path_prefix.startswith("/"):
+        logger.warning(
+            "Rule '%s' has non-absolute Path '%s', ignoring it.",
+            rule_name,
+            path_prefix,
+        )
+        return None
+
+    removable: bool | None = None
+    if "Removable" in section:
+        try:
+            removable = section.getboolean("Removable")
+        except ValueError:
+            logger.warning(
+                "Rule '%s' has invalid Removable value, ignoring it.",
+                rule_name,
+            )
+            return None
+
+    return MountRule(
+        name=rule_name,
+        action=action,
+        path_prefix=path_prefix,
+        fs_type=section.get("FsType"),
+        source=section.get("Source"),
+        removable=removable,
+    )
+
+
+def load_rule_list(config_dir: Path = rule_config_dir) -> list[MountRule]:
+    """
+    Reads all rules from the config directory, in lexical file order.
+    """
+
+    rule_list: list[MountRule] = []
+    try:
+        config_file_list: list[Path] = sorted(config_dir.glob("*.conf"))
+    except OSError:
+        return rule_list
+
+    for config_file in config_file_list:
+        config_parser: configparser.ConfigParser = configparser.ConfigParser(
+            interpolation=None
+        )
+        try:
+            config_parser.read(config_file, encoding="utf-8")
+        except (OSError, configparser.Error) as config_error:
+            logger.warning(
+                "Could not parse '%s', ignoring it: %s",
+                config_file,
+                config_error,
+            )
+            continue
+        for section_name in config_parser.sections():
+            if not section_name.startswith("rule:"):
+                logger.warning(
+                    "Unknown section '%s' in '%s', ignoring it.",
+                    section_name,
+                    config_file,
+                )
+                continue
+            rule: MountRule | None = parse_rule_section(
+                section_name, config_parser[section_name]
+            )
+            if rule is not None:
+                rule_list.append(rule)
+
+    return rule_list
+
+
+@functools.cache
+def get_mount_classifier() -> MountClassifier:
+    """
+    Loads and compiles the rule set. This is done once, at startup.
+    """
+
+    mount_classifier: MountClassifier = MountClassifier(load_rule_list())
+    logger.info(
+        "Loaded %s mount classification rules.", mount_classifier.rule_count
+    )
+    return mount_classifier
+
+
+def adjust_live_mode(
+    live_mode_str: str, safe_fs_count: int, unsafe_fs_count: int
+) -> str:
+    """
+    Adjusts a semi-persistent live mode reported by live-mode.sh to match
+    the writable filesystem lists after the rules have been applied. For
+    instance, if every unsafe mount was marked as safe, the mode is no
+    longer '-unsafe'.
+    """
+
+    for live_base_str in ("iso-live", "grub-live"):
+        if live_mode_str not in (
+            f"{live_base_str}-semi-persistent",
+            f"{live_base_str}-semi-persistent-unsafe",
+        ):
+            continue
+        if unsafe_fs_count != 0:
+            return f"{live_base_str}-semi-persistent-unsafe"
+        if safe_fs_count != 0:
+            return f"{live_base_str}-semi-persistent"
+        return live_base_str
+    return live_mode_str
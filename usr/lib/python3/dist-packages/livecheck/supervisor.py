@@ -0,0 +1,191 @@
+#!/usr/bin/python3 -su
+
+# Copyright (C) 2026 - 2026 ENCRYPTED SUPPORT LLC <adrelanos@whonix.org>
+# See the file COPYING for copying conditions.
+
+"""
+supervisor.py - Runs livecheck's helper scripts with hard timeouts, and
+tracks repeated failures so that helpers are retried with exponential
+backoff rather than on every mount event.
+"""
+
+import os
+import signal
+import socket
+import subprocess
+import threading
+
+from pathlib import Path
+
+from livecheck.logger import logger
+
+## How long a helper script may run before it is killed. Helpers that hang
+## (i.e. on a stale NFS mount or a stuck lsblk) would otherwise block the
+## monitor thread forever.
+helper_timeout_seconds: float = 20.0
+## How long to wait for a helper to exit after sending SIGTERM to its process
+## group before sending SIGKILL, and after SIGKILL before giving up on it.
+helper_kill_grace_seconds: float = 2.0
+
+## lsblk output that live-mode.sh reads. livecheck-lsblk.socket produces it
+## the first time it is requested in a boot, and closes the connection once
+## it is there.
+lsblk_done_file: Path = Path("/run/desktop-config-dist/done")
+lsblk_socket_path: str = "/run/desktop-config-dist/livecheck-lsblk.sock"
+
+backoff_base_seconds: float = 2.0
+backoff_max_seconds: float = 300.0
+
+running_helper_lock: threading.Lock = threading.Lock()
+running_helper_set: set[subprocess.Popen[str]] = set()
+
+
+def kill_helper(helper_proc: subprocess.Popen[str]) -> None:
+    """
+    Terminates a helper and all of its children by killing its process
+    group, escalating from SIGTERM to SIGKILL.
+    """
+
+    for kill_signal in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(helper_proc.pid, kill_signal)
+        except ProcessLookupError:
+            return
+        try:
+            helper_proc.wait(timeout=helper_kill_grace_seconds)
+            return
+        except subprocess.TimeoutExpired:
+            continue
+
+    ## A process stuck in uninterruptible sleep can't be killed. Don't block
+    ## on it, it will be reaped once it exits.
+    logger.error(
+        "Helper process '%s' did not exit after SIGKILL, abandoning it.",
+        helper_proc.pid,
+    )
+
+
+def run_helper(
+    helper_args: list[str], timeout: float = helper_timeout_seconds
+) -> subprocess.CompletedProcess[str]:
+    """
+    Runs a helper script in its own process group and captures its output.
+    If the helper does not finish within the timeout, the whole process
+    group is killed and subprocess.TimeoutExpired is raised.
+    """
+
+    helper_proc: subprocess.Popen[str] = subprocess.Popen(
+        helper_args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+        start_new_session=True,
+    )
+    with running_helper_lock:
+        running_helper_set.add(helper_proc)
+
+    try:
+        try:
+            stdout_str, stderr_str = helper_proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            logger.warning(
+                "Helper '%s' did not finish within %s seconds, killing it.",
+                helper_args[0],
+                timeout,
+            )
+            kill_helper(helper_proc)
+            raise
+    finally:
+        with running_helper_lock:
+            running_helper_set.discard(helper_proc)
+
+    return subprocess.CompletedProcess(
+        helper_args, helper_proc.returncode, stdout_str, stderr_str
+    )
+
+
+def request_lsblk_output(timeout: float = helper_timeout_seconds) -> None:
+    """
+    Makes sure the lsblk output the helper scripts need has been produced in
+    this boot, waiting for it if needed. Failures are only logged, the helper
+    scripts report missing output themselves.
+    """
+
+    if lsblk_done_file.exists():
+        return
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as lsblk_sock:
+            lsblk_sock.settimeout(timeout)
+            lsblk_sock.connect(lsblk_socket_path)
+            while lsblk_sock.recv(4096) != b"":
+                pass
+    except OSError as lsblk_error:
+        logger.warning("Could not request lsblk output: %s", lsblk_error)
+        return
+    if not lsblk_done_file.exists():
+        logger.warning(
+            "lsblk output was requested, but it has not been produced."
+        )
+
+
+def cancel_running_helpers() -> None:
+    """
+    Kills all currently running helpers. Used when livecheck exits, so that
+    no hung helpers are left behind.
+    """
+
+    with running_helper_lock:
+        helper_proc_list: list[subprocess.Popen[str]] = list(
+            running_helper_set
+        )
+    for helper_proc in helper_proc_list:
+        try:
+            os.killpg(helper_proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+class HelperBackoff:
+    """
+    Tracks consecutive helper failures and computes how long to wait before
+    retrying.
+    """
+
+    def __init__(
+        self,
+        base_seconds: float = backoff_base_seconds,
+        max_seconds: float = backoff_max_seconds,
+    ) -> None:
+        """
+        Init function.
+        """
+
+        self.base_seconds: float = base_seconds
+        self.max_seconds: float = max_seconds
+        self.failure_count: int = 0
+
+    def record_success(self) -> None:
+        """
+        Resets the failure count.
+        """
+
+        self.failure_count = 0
+
+    def record_failure(self) -> None:
+        """
+        Increments the failure count.
+        """
+
+        self.failure_count += 1
+
+    def delay(self) -> float:
+        """
+        Returns the number of seconds to wait before the next attempt.
+        """
+
+        if self.failure_count == 0:
+            return 0.0
+        return min(
+            self.base_seconds * 2 ** (self.failure_count - 1),
+            self.max_seconds,
+        )